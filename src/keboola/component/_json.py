@@ -0,0 +1,98 @@
+"""
+Internal JSON backend used for the config, state and manifest files.
+
+The fastest available implementation is picked on import in following order:
+`orjson`, `rapidjson`, `ujson` and the standard library `json` module as a fallback.
+None of the libraries is required, install any of them to speed up the parsing.
+
+All backends share the same interface:
+
+- `loads(data)` accepts `bytes` or `str`
+- `dumps(obj)` returns UTF-8 encoded `bytes`
+
+Inputs the fast backend cannot handle (e.g. `NaN` literals, integers out of 64bit range) are passed
+to the standard library so the behaviour stays the same as with plain `json`.
+
+The serialization always uses the standard library. The written state and manifest files are read and diffed
+by other tools, so their bytes must not depend on the installed backend (separators, non-ASCII escaping
+and float formatting differ between the libraries).
+"""
+# Python 3.7 support
+from __future__ import annotations
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import rapidjson
+except ImportError:  # pragma: no cover
+    rapidjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+def _std_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+if orjson is not None:
+    BACKEND = 'orjson'
+    _fast_loads = orjson.loads
+elif rapidjson is not None:  # pragma: no cover
+    BACKEND = 'rapidjson'
+    _fast_loads = rapidjson.loads
+elif ujson is not None:  # pragma: no cover
+    BACKEND = 'ujson'
+    _fast_loads = ujson.loads
+else:  # pragma: no cover
+    BACKEND = 'json'
+    _fast_loads = _std_loads
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Deserialize JSON document from `bytes` or `str`.
+
+    Raises:
+        ValueError: on invalid JSON document (`json.JSONDecodeError`)
+    """
+    try:
+        return _fast_loads(data)
+    except ValueError:
+        # let the stdlib decide, it accepts NaN/Infinity and produces the usual JSONDecodeError otherwise
+        return _std_loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize object to UTF-8 encoded JSON `bytes`, the output is the same as of `json.dumps`.
+
+    Raises:
+        TypeError: if the object is not JSON serializable
+    """
+    return json.dumps(obj).encode('utf-8')
+
+
+def load_file(path: str) -> Any:
+    """
+    Read and deserialize JSON file in a single read.
+    """
+    with open(path, 'rb') as in_file:
+        return loads(in_file.read())
+
+
+def dump_file(obj: Any, path: str):
+    """
+    Serialize object and write it to a file in a single write.
+    """
+    data = dumps(obj)
+    with open(path, 'wb') as out_file:
+        out_file.write(data)
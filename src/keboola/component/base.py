@@ -1,5 +1,4 @@
 import contextlib
-import json
 import logging
 import os
 import sys
@@ -10,6 +9,7 @@ from pathlib import Path
 from typing import Dict
 from typing import Union, List, Optional
 
+from . import _json
 from . import dao
 from . import table_schema as ts
 from .interface import CommonInterface
@@ -17,9 +17,6 @@ from .sync_actions import SyncActionResult, process_sync_action_result
 
 KEY_DEBUG = 'debug'
 
-# Mapping of sync actions "action name":"method_name"
-_SYNC_ACTION_MAPPING = {"run": "run"}
-
 
 def sync_action(action_name: str):
     """
@@ -78,7 +75,6 @@ def sync_action(action_name: str):
         # to allow pythonic names / action name mapping
         if action_name == 'run':
             raise ValueError('Sync action name "run" is reserved base action! Use different name.')
-        _SYNC_ACTION_MAPPING[action_name] = func.__name__
 
         @wraps(func)
         def action_wrapper(self, *args, **kwargs):
@@ -113,12 +109,26 @@ def sync_action(action_name: str):
                 else:
                     raise e
 
+        # picked up by ComponentBase.__init_subclass__
+        action_wrapper._sync_action_name = action_name
         return action_wrapper
 
     return decorate
 
 
 class ComponentBase(ABC, CommonInterface):
+    # Mapping of sync actions "action name":"method_name" defined on the component class, built on subclass creation
+    _sync_actions: Dict[str, str] = {"run": "run"}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        sync_actions = dict(cls._sync_actions)
+        for name, attr in vars(cls).items():
+            action_name = getattr(attr, '_sync_action_name', None)
+            if action_name:
+                sync_actions[action_name] = name
+        cls._sync_actions = sync_actions
+
     def __init__(self, data_path_override: Optional[str] = None,
                  schema_path_override: Optional[str] = None,
                  required_parameters: Optional[list] = None,
@@ -235,7 +245,7 @@ class ComponentBase(ABC, CommonInterface):
     def execute_action(self):
         """
         Executes action defined in the configuration.
-        The default action is 'run'. See base._SYNC_ACTION_MAPPING
+        The default action is 'run'. See ComponentBase._sync_actions
         """
         action = self.configuration.action
         if not action:
@@ -243,7 +253,7 @@ class ComponentBase(ABC, CommonInterface):
             action = 'run'
 
         try:
-            action = _SYNC_ACTION_MAPPING[action]
+            action = type(self)._sync_actions[action]
             action_method = getattr(self, action)
         except (AttributeError, KeyError) as e:
             raise AttributeError(f"The defined action {action} is not implemented!") from e
@@ -336,8 +346,7 @@ class ComponentBase(ABC, CommonInterface):
     @staticmethod
     def _load_table_schema_dict(schema_name: str, schema_folder_path: str) -> Dict:
         try:
-            with open(os.path.join(schema_folder_path, f"{schema_name}.json"), 'r') as schema_file:
-                json_schema = json.loads(schema_file.read())
+            json_schema = _json.load_file(os.path.join(schema_folder_path, f"{schema_name}.json"))
         except FileNotFoundError as file_err:
             raise FileNotFoundError(
                 f"Schema for corresponding schema name : {schema_name} is not found in the schema directory. "
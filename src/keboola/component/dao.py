@@ -2,8 +2,9 @@
 from __future__ import annotations
 
 import dataclasses
-import json
+import functools
 import logging
+import re
 import warnings
 from abc import ABC, abstractmethod
 from collections import OrderedDict
@@ -15,6 +16,7 @@ from typing import List, Union, Dict, Optional, OrderedDict as TypeOrderedDict
 
 from deprecated import deprecated
 
+from . import _json
 from .exceptions import UserException
 
 try:
@@ -23,6 +25,21 @@ except ImportError:
     from typing_extensions import Literal
 
 KBC_DEFAULT_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+# KBC_DEFAULT_TIME_FORMAT with numeric UTC offset, e.g. 2015-11-02T09:11:37+0100
+_KBC_TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}[+-]\d{4}', re.ASCII)
+
+
+def _parse_kbc_timestamp(value: str) -> datetime:
+    """
+    Parses timestamp in the KBC_DEFAULT_TIME_FORMAT.
+
+    The common format is converted to ISO 8601 and parsed by `datetime.fromisoformat`,
+    which is much faster than `datetime.strptime`. Other values fall back to `strptime`.
+    """
+    if _KBC_TIMESTAMP_RE.fullmatch(value):
+        # +0100 -> +01:00, fromisoformat does not support offsets without colon before Python 3.11
+        return datetime.fromisoformat(f'{value[:-2]}:{value[-2:]}')
+    return datetime.strptime(value, KBC_DEFAULT_TIME_FORMAT)
 
 
 @dataclass
@@ -87,7 +104,11 @@ class SupportedDataTypes(str, Enum):
 
     @classmethod
     def is_valid_type(cls, data_type: str):
-        return data_type in cls.list()
+        # only strings can be valid, the set lookup would fail with TypeError on unhashable values
+        return isinstance(data_type, str) and data_type in _SUPPORTED_DATA_TYPE_VALUES
+
+
+_SUPPORTED_DATA_TYPE_VALUES = frozenset(c.value for c in SupportedDataTypes)
 
 
 class KBCMetadataKeys(Enum):
@@ -107,6 +128,15 @@ class KBCMetadataKeys(Enum):
     # it will be used when the bucket is shared
 
 
+# plain string values of the metadata keys used per column in TableMetadata
+_KEY_BASE_DATA_TYPE = KBCMetadataKeys.base_data_type.value
+_KEY_SOURCE_DATA_TYPE = KBCMetadataKeys.source_data_type.value
+_KEY_DATA_TYPE_NULLABLE = KBCMetadataKeys.data_type_nullable.value
+_KEY_DATA_TYPE_LENGTH = KBCMetadataKeys.data_type_length.value
+_KEY_DATA_TYPE_DEFAULT = KBCMetadataKeys.data_type_default.value
+_KEY_DESCRIPTION = KBCMetadataKeys.description.value
+
+
 class TableMetadata:
     """
     Abstraction of metadata and table_metadata than can be provided within the manifest file. This is useful for
@@ -205,10 +235,10 @@ class TableMetadata:
         if legacy_manifest:
             final_metadata_list = [{'key': key,
                                     'value': value}
-                                   for key, value in self.table_metadata.items() if value not in [None, '']]
+                                   for key, value in self.table_metadata.items() if value not in (None, '')]
         else:
             final_metadata_list = {key: value
-                                   for key, value in self.table_metadata.items() if value not in [None, '']}
+                                   for key, value in self.table_metadata.items() if value not in (None, '')}
 
         return final_metadata_list
 
@@ -242,20 +272,10 @@ class TableMetadata:
                 Returns: dict
 
         """
-        final_column_metadata = dict()
-
-        # collect unique metadata keys
-        for column in self.column_metadata:
-            column_metadata_dicts = self.column_metadata[column]
-            if not final_column_metadata.get(column):
-                final_column_metadata[column] = list()
-
-            column_metadata = [{'key': key,
-                                'value': value} for key, value in
-                               column_metadata_dicts.items() if value not in [None, '']]
-            final_column_metadata[column].extend(column_metadata)
-
-        return final_column_metadata
+        # metadata keys are unique per column already, single pass over the items
+        return {column: [{'key': key,
+                          'value': value} for key, value in column_metadata.items() if value not in (None, '')]
+                for column, column_metadata in self.column_metadata.items()}
 
     @property
     @deprecated(version='1.5.1', reason="Please use TableDefinition.description instead of TableMetadata")
@@ -266,7 +286,7 @@ class TableMetadata:
         Returns: str
 
         """
-        return self.table_metadata.get(KBCMetadataKeys.description.value)
+        return self.table_metadata.get(_KEY_DESCRIPTION)
 
     @property
     @deprecated(version='1.5.1', reason="Column datatypes were moved to dao.TableDefinition.schema property."
@@ -280,7 +300,7 @@ class TableMetadata:
 
         """
 
-        return self.get_columns_metadata_by_key(KBCMetadataKeys.base_data_type.value)
+        return self.get_columns_metadata_by_key(_KEY_BASE_DATA_TYPE)
 
     @property
     @deprecated(version='1.5.1', reason="Column datatypes were moved to dao.TableDefinition.schema property."
@@ -294,7 +314,7 @@ class TableMetadata:
 
         """
 
-        return self.get_columns_metadata_by_key(KBCMetadataKeys.description.value)
+        return self.get_columns_metadata_by_key(_KEY_DESCRIPTION)
 
     @deprecated(version='1.5.1', reason="Please use schema instead of Table Metadata")
     def get_columns_metadata_by_key(self, metadata_key) -> dict:
@@ -305,12 +325,8 @@ class TableMetadata:
         Returns: dict e.g. {"col1name":"value_of_metadata_with_the_key"}
 
         """
-        column_types = dict()
-        for col in self.column_metadata:
-            if col.get(metadata_key):
-                column_types[col] = col[metadata_key]
-
-        return column_types
+        return {col: metadata[metadata_key] for col, metadata in self.column_metadata.items()
+                if metadata_key in metadata}
 
     def add_column_descriptions(self, column_descriptions: dict):
         """
@@ -321,7 +337,7 @@ class TableMetadata:
 
                 """
         for col in column_descriptions:
-            self.add_column_metadata(col, KBCMetadataKeys.description.value, column_descriptions[col])
+            self.add_column_metadata(col, _KEY_DESCRIPTION, column_descriptions[col])
 
     @deprecated(version='1.5.1', reason="Column datatypes were moved to dao.TableDefinition.schema property."
                                         "Please use the dao.ColumnDefinition objects and associated"
@@ -340,8 +356,13 @@ class TableMetadata:
             ValueError when the provided data type value is not recognized
         """
 
-        for col in column_types:
-            self.add_column_data_type(col, column_types[col])
+        # validate all types before any metadata is added
+        self._validate_data_types(column_types)
+        column_metadata = self.column_metadata
+        for col, data_type in column_types.items():
+            metadata = column_metadata.setdefault(col, {})
+            metadata[_KEY_BASE_DATA_TYPE] = data_type.value if isinstance(data_type, SupportedDataTypes) else data_type
+            metadata[_KEY_DATA_TYPE_NULLABLE] = False
 
     @deprecated(version='1.5.1', reason="Column datatypes were moved to dao.TableDefinition.schema property."
                                         "Please use the dao.ColumnDefinition objects and associated"
@@ -375,19 +396,21 @@ class TableMetadata:
         if isinstance(data_type, SupportedDataTypes):
             base_type = data_type.value
         else:
-            self._validate_data_types({column: data_type})
+            if not SupportedDataTypes.is_valid_type(data_type):
+                # raises ValueError with the list of supported types
+                self._validate_data_types({column: data_type})
             base_type = data_type
 
-        self.add_column_metadata(column, KBCMetadataKeys.base_data_type.value, base_type)
-        self.add_column_metadata(column, KBCMetadataKeys.data_type_nullable.value, nullable)
+        self.add_column_metadata(column, _KEY_BASE_DATA_TYPE, base_type)
+        self.add_column_metadata(column, _KEY_DATA_TYPE_NULLABLE, nullable)
 
         if source_data_type is not None:
-            self.add_column_metadata(column, KBCMetadataKeys.source_data_type.value, source_data_type)
+            self.add_column_metadata(column, _KEY_SOURCE_DATA_TYPE, source_data_type)
 
         if length is not None:
-            self.add_column_metadata(column, KBCMetadataKeys.data_type_length.value, length)
+            self.add_column_metadata(column, _KEY_DATA_TYPE_LENGTH, length)
         if default is not None:
-            self.add_column_metadata(column, KBCMetadataKeys.data_type_default.value, default)
+            self.add_column_metadata(column, _KEY_DATA_TYPE_DEFAULT, default)
 
     def add_table_description(self, description: str):
         """
@@ -395,7 +418,7 @@ class TableMetadata:
         Args:
             description: str
         """
-        self.add_table_metadata(KBCMetadataKeys.description.value, description)
+        self.add_table_metadata(_KEY_DESCRIPTION, description)
 
     def add_table_metadata(self, key: str, value: str):
         """
@@ -405,7 +428,7 @@ class TableMetadata:
         """
         if value is None:
             return
-        self.table_metadata = {**self.table_metadata, **{key: value}}
+        self.table_metadata[key] = value
 
     @deprecated(version='1.5.1', reason="Column metadata ere moved to dao.TableDefinition.schema property."
                                         "Please use the dao.ColumnDefinition.metadata")
@@ -415,12 +438,7 @@ class TableMetadata:
         Args:
 
         """
-        if value is None:
-            return
-        if not self.column_metadata.get(column):
-            self.column_metadata[column] = dict()
-
-        self.column_metadata[column][key] = value
+        self._add_column_metadata(column, key, value)
 
         # self.schema = [ColumnDefinition(name=column, data_type={backend: DataType(type=value)})]
 
@@ -434,20 +452,26 @@ class TableMetadata:
         Args:
             column_metadata: dict {"column_name":[{"some_key":"some_value"}]}
         """
-        for column, metadata_list in column_metadata:
+        for column, metadata_list in column_metadata.items():
             for metadata in metadata_list:
-                key = metadata.items()[0]
-                value = metadata[key]
-                self.add_column_metadata(column, key, value)
+                for key, value in metadata.items():
+                    self._add_column_metadata(column, key, value)
+
+    def _add_column_metadata(self, column: str, key: str, value: Union[str, bool, int]):
+        # shared by the deprecated methods above, calling those would emit the deprecation warning for each key
+        if value is None:
+            return
+        self.column_metadata.setdefault(column, {})[key] = value
 
     @staticmethod
     def _validate_data_types(column_types: dict):
-        errors = []
-        for col in column_types:
-            dtype = column_types[col]
-            if not SupportedDataTypes.is_valid_type(dtype):
-                errors.append(f'Datatype "{dtype}" is not valid KBC Basetype!')
-        if errors:
+        # unique invalid types in order of appearance, these may be unhashable
+        invalid_types = []
+        for dtype in column_types.values():
+            if not SupportedDataTypes.is_valid_type(dtype) and dtype not in invalid_types:
+                invalid_types.append(dtype)
+        if invalid_types:
+            errors = [f'Datatype "{dtype}" is not valid KBC Basetype!' for dtype in invalid_types]
             raise ValueError(', '.join(errors) + f'\n Supported base types are: [{SupportedDataTypes.list()}]')
 
 
@@ -546,13 +570,9 @@ class ColumnDefinition:
         self.data_types[backend] = data_type
 
     def to_dict(self, name: str):
-        # convert datatypes to dict
-        datatypes_dict = {}
-        for key, value in self.data_types.items():
-            datatypes_dict[key] = dataclasses.asdict(value)
-
-        datatypes_dict = {key: {k.replace('dtype', 'type'): v for k, v in value.items()}
-                          for key, value in datatypes_dict.items()}
+        # convert datatypes to dict, DataType fields are flat so no need for the recursive dataclasses.asdict
+        datatypes_dict = {key: {'type': value.dtype, 'length': value.length, 'default': value.default}
+                          for key, value in self.data_types.items()}
 
         result = {
             'name': name,
@@ -563,11 +583,16 @@ class ColumnDefinition:
             'metadata': self.metadata
         }
         # TODO: tohle bych delal az pri zapisu manifestu celkove, chceme vyhodit None values, false nechat
-        filtered = {k: v for k, v in result.items() if v not in [False]}
+        filtered = {k: v for k, v in result.items() if v not in (False,)}
 
         return filtered
 
 
+# output manifest attributes replaced by the schema in the new (non legacy) manifest format
+_LEGACY_ONLY_OUT_ATTRIBUTES = frozenset(['primary_key', 'columns', 'distribution_key', 'column_metadata', 'metadata'])
+_NEW_MANIFEST_OUT_ATTRIBUTES = ('manifest_type', 'has_header', 'table_metadata', 'schema')
+
+
 @dataclass
 class SupportedManifestAttributes(SubscriptableDataclass):
     out_attributes: List[str]
@@ -582,11 +607,8 @@ class SupportedManifestAttributes(SubscriptableDataclass):
             exclude = self.out_legacy_exclude
 
             if not legacy_manifest:
-                to_remove = ['primary_key', 'columns', 'distribution_key', 'column_metadata', 'metadata']
-                attributes = list(set(attributes).difference(to_remove))
-
-                to_add = ['manifest_type', 'has_header', 'table_metadata', 'schema']
-                attributes.extend(to_add)
+                attributes = list(set(attributes).difference(_LEGACY_ONLY_OUT_ATTRIBUTES))
+                attributes.extend(_NEW_MANIFEST_OUT_ATTRIBUTES)
 
         elif stage == 'in':
             attributes = self.in_attributes
@@ -602,6 +624,16 @@ class SupportedManifestAttributes(SubscriptableDataclass):
         return attributes
 
 
+def _load_manifest(manifest_file_path: str) -> dict:
+    """
+    Loads the manifest file in a single open call. Returns empty dict if the manifest does not exist.
+    """
+    try:
+        return _json.load_file(manifest_file_path)
+    except FileNotFoundError:
+        return dict()
+
+
 class IODefinition(ABC):
 
     def __init__(self, full_path):
@@ -1098,23 +1130,23 @@ class TableDefinition(IODefinition):
         """
         is_sliced = False
         full_path = None
-        manifest = dict()
-        if Path(manifest_file_path).exists():
-            with open(manifest_file_path) as in_file:
-                manifest = json.load(in_file)
+        manifest = _load_manifest(manifest_file_path)
 
         file_path = Path(manifest_file_path.replace('.manifest', ''))
+        # resolve the counterpart with as few stat calls as possible
+        file_is_dir = file_path.is_dir()
+        file_exists = file_is_dir or file_path.exists()
 
-        if file_path.is_dir() and manifest:
+        if file_is_dir and manifest:
             is_sliced = True
-        elif file_path.is_dir() and not manifest:
+        elif file_is_dir and not manifest:
             # skip folders that do not have matching manifest
             raise ValueError(f'The manifest {manifest_file_path} does not exist '
                              f'and it'f's matching file {file_path} is folder!')
-        elif not file_path.exists() and not manifest:
+        elif not file_exists and not manifest:
             raise ValueError(f'Nor the manifest file or the corresponding file {file_path} exist!')
 
-        if file_path.exists():
+        if file_exists:
             full_path = str(file_path)
             name = file_path.name
         else:
@@ -1246,8 +1278,20 @@ class TableDefinition(IODefinition):
 
         """
 
-        supported_fields = self._manifest_attributes.get_attributes_by_stage(manifest_type, legacy_queue,
-                                                                             legacy_manifest)
+        supported_fields = set(self._manifest_attributes.get_attributes_by_stage(manifest_type, legacy_queue,
+                                                                                 legacy_manifest))
+        # the legacy metadata and the new schema representations are built only when the manifest contains them
+        metadata = column_metadata = table_metadata = None
+        schema = []
+        if not supported_fields or 'metadata' in supported_fields:
+            metadata = self.table_metadata.get_table_metadata_for_manifest(legacy_manifest=True)
+        if not supported_fields or 'column_metadata' in supported_fields:
+            column_metadata = self.table_metadata._get_legacy_column_metadata_for_manifest()
+        if not supported_fields or 'table_metadata' in supported_fields:
+            table_metadata = self.table_metadata.get_table_metadata_for_manifest()
+        if (not supported_fields or 'schema' in supported_fields) and isinstance(self.schema, (OrderedDict, dict)):
+            schema = [col.to_dict(name) for name, col in self.schema.items()]
+
         fields = {
             'id': self.id,
             'uri': self._uri,
@@ -1267,28 +1311,24 @@ class TableDefinition(IODefinition):
             'write_always': self.write_always,
             'delimiter': self.delimiter,
             'enclosure': self.enclosure,
-            'metadata': self.table_metadata.get_table_metadata_for_manifest(legacy_manifest=True),
-            'column_metadata': self.table_metadata._get_legacy_column_metadata_for_manifest(),
+            'metadata': metadata,
+            'column_metadata': column_metadata,
             'manifest_type': manifest_type,
             'has_header': self.has_header,
-            'table_metadata': self.table_metadata.get_table_metadata_for_manifest(),
+            'table_metadata': table_metadata,
             'delete_where_column': self.delete_where_column,
             'delete_where_values': self.delete_where_values,
             'delete_where_operator': self.delete_where_operator,
-            'schema': [col.to_dict(name)
-                       for name, col in self.schema.items()] if isinstance(self.schema, (OrderedDict, dict)) else []
+            'schema': schema
         }
 
         if (legacy_manifest and not self.has_header) or self.stage == 'in':
             fields['columns'] = self.column_names
 
-        new_dict = fields.copy()
+        if not supported_fields:
+            return fields
 
-        if supported_fields:
-            for attr in fields:
-                if attr not in supported_fields:
-                    new_dict.pop(attr, None)
-        return new_dict
+        return {attr: value for attr, value in fields.items() if attr in supported_fields}
 
     def _has_header_in_file(self):
         if self.is_sliced:
@@ -1429,12 +1469,14 @@ class TableDefinition(IODefinition):
         if not isinstance(primary_key, list):
             raise TypeError("Primary key must be a list")
         if not self._legacy_mode:
+            schema = self.schema
+            # validate all the columns first so the schema is not left partially updated
+            missing = [col for col in primary_key if col not in schema]
+            if missing:
+                raise UserException(f"Primary key column {missing[0]} not found in schema. "
+                                    f"Please specify all columns / schema")
             for col in primary_key:
-                if col in self.schema:
-                    self.schema[col].primary_key = True
-                else:
-                    raise UserException(f"Primary key column {col} not found in schema. "
-                                        f"Please specify all columns / schema")
+                schema[col].primary_key = True
         else:
             self._legacy_primary_key = primary_key
 
@@ -1462,15 +1504,17 @@ class TableDefinition(IODefinition):
     def table_metadata(self, table_metadata: TableMetadata):
         self._table_metadata = table_metadata
         # backward compatibility legacy support
+        schema = self.schema
         for col, val in table_metadata._get_legacy_column_metadata_for_manifest().items():
-            if not self.schema.get(col):
-                self.schema[col] = ColumnDefinition()
-            self.schema[col].metadata = {item['key']: item['value'] for item in val}
+            column = schema.get(col)
+            if column is None:
+                column = schema[col] = ColumnDefinition()
+            column.metadata = {item['key']: item['value'] for item in val}
 
     @property
     def created(self) -> Union[datetime, None]:  # Created timestamp  in the KBC Storage (read only input attribute)
         if self._created:
-            return datetime.strptime(self._created, KBC_DEFAULT_TIME_FORMAT)
+            return _parse_kbc_timestamp(self._created)
         else:
             return None
 
@@ -1490,7 +1534,7 @@ class TableDefinition(IODefinition):
     def is_alias(self) -> bool:
         return self._is_alias
 
-    def add_column(self, name: str, definition: ColumnDefinition = ColumnDefinition()):
+    def add_column(self, name: str, definition: Optional[ColumnDefinition] = None):
         """
         Add column definition, accepts either ColumnDefinition or a string
         (in which case the base type STRING will be used).
@@ -1499,7 +1543,8 @@ class TableDefinition(IODefinition):
         if name in self._schema:
             raise ValueError(f"Column with name '{name}' already exists")
 
-        self._schema[name] = definition
+        # new instance for each column, a shared default would be mutated by all of them
+        self._schema[name] = ColumnDefinition() if definition is None else definition
 
     def update_column(self, name: str, column_definition: ColumnDefinition):
         if not isinstance(column_definition, ColumnDefinition):
@@ -1525,7 +1570,7 @@ class TableDefinition(IODefinition):
                 self.add_column(name, column)
 
     def update_columns(self, columns: Dict[str, ColumnDefinition]):
-        for name, column in columns:
+        for name, column in columns.items():
             self.update_column(name, column)
 
     def delete_columns(self, column_names: List[str]):
@@ -1729,10 +1774,7 @@ class FileDefinition(IODefinition):
 
 
         """
-        manifest = dict()
-        if Path(manifest_file_path).exists():
-            with open(manifest_file_path) as in_file:
-                manifest = json.load(in_file)
+        manifest = _load_manifest(manifest_file_path)
 
         file_path = Path(manifest_file_path.replace('.manifest', ''))
 
@@ -1927,7 +1969,7 @@ class FileDefinition(IODefinition):
     @property
     def created(self) -> Union[datetime, None]:  # Created timestamp  in the KBC Storage (read only input attribute)
         if self._created:
-            return datetime.strptime(self._created, KBC_DEFAULT_TIME_FORMAT)
+            return _parse_kbc_timestamp(self._created)
         else:
             return None
 
@@ -2036,5 +2078,10 @@ def build_dataclass_from_dict(data_class, dict_value):
     Returns: dataclass of specified type
 
     """
-    field_names = set(f.name for f in dataclasses.fields(data_class))
-    return data_class(**{k: v for k, v in dict_value.items() if k in field_names})
+    field_names = _get_dataclass_field_names(data_class)
+    return data_class(**{k: dict_value[k] for k in dict_value.keys() & field_names})
+
+
+@functools.lru_cache(maxsize=None)
+def _get_dataclass_field_names(data_class) -> frozenset:
+    return frozenset(f.name for f in dataclasses.fields(data_class))
@@ -4,19 +4,19 @@ from __future__ import annotations
 import argparse
 import csv
 import glob
-import json
 import logging
 import os
 import sys
 import warnings
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Union, OrderedDict
+from typing import List, Dict, Iterator, Optional, Union, OrderedDict
 
 from deprecated import deprecated
 from pygelf import GelfUdpHandler, GelfTcpHandler
 from pytz import utc
 
+from . import _json
 from . import dao
 from .dao import ColumnDefinition, TableDefinition
 from .exceptions import UserException
@@ -30,6 +30,27 @@ def register_csv_dialect():
                          quotechar='"')
 
 
+# environment variable names in the order of dao.EnvironmentVariables fields
+_ENV_KEYS = ('KBC_DATADIR',
+             'KBC_RUNID',
+             'KBC_PROJECTID',
+             'KBC_STACKID',
+             'KBC_CONFIGID',
+             'KBC_COMPONENTID',
+             'KBC_CONFIGROWID',
+             'KBC_BRANCHID',
+             'KBC_STAGING_FILE_PROVIDER',
+             'KBC_PROJECTNAME',
+             'KBC_TOKENID',
+             'KBC_TOKENDESC',
+             'KBC_TOKEN',
+             'KBC_URL',
+             'KBC_REALUSER',
+             'KBC_LOGGER_ADDR',
+             'KBC_LOGGER_PORT',
+             'KBC_DATA_TYPE_SUPPORT')
+
+
 def init_environment_variables() -> dao.EnvironmentVariables:
     """
     Initializes environment variables available in the docker environment
@@ -38,26 +59,9 @@ def init_environment_variables() -> dao.EnvironmentVariables:
     Returns:
         dao.EnvironmentVariables:
     """
-    return dao.EnvironmentVariables(data_dir=os.environ.get('KBC_DATADIR', None),
-                                    run_id=os.environ.get('KBC_RUNID', None),
-                                    project_id=os.environ.get('KBC_PROJECTID', None),
-                                    stack_id=os.environ.get('KBC_STACKID', None),
-                                    config_id=os.environ.get('KBC_CONFIGID', None),
-                                    component_id=os.environ.get('KBC_COMPONENTID', None),
-                                    config_row_id=os.environ.get('KBC_CONFIGROWID', None),
-                                    branch_id=os.environ.get('KBC_BRANCHID', None),
-                                    staging_file_provider=os.environ.get('KBC_STAGING_FILE_PROVIDER', None),
-                                    project_name=os.environ.get('KBC_PROJECTNAME', None),
-                                    token_id=os.environ.get('KBC_TOKENID', None),
-                                    token_desc=os.environ.get('KBC_TOKENDESC', None),
-                                    token=os.environ.get('KBC_TOKEN', None),
-                                    url=os.environ.get('KBC_URL', None),
-                                    real_user=os.environ.get('KBC_REALUSER', None),
-                                    logger_addr=os.environ.get('KBC_LOGGER_ADDR', None),
-                                    logger_port=os.environ.get('KBC_LOGGER_PORT', None),
-                                    data_type_support=os.environ.get('KBC_DATA_TYPE_SUPPORT', None),
-                                    project_features=os.environ.get('KBC_PROJECT_FEATURE_GATES', '')
-                                    )
+    env = os.environ
+    return dao.EnvironmentVariables(*[env.get(k) for k in _ENV_KEYS],
+                                    env.get('KBC_PROJECT_FEATURE_GATES', ''))
 
 
 class CommonInterface:
@@ -117,6 +121,8 @@ class CommonInterface:
             )
 
         self.data_folder_path = data_folder_path
+        # parsed lazily on first access, see the configuration property
+        self._configuration: Optional[Configuration] = None
 
     def _get_data_folder_from_context(self):
         # try to get from argument parameter
@@ -159,6 +165,21 @@ class CommonInterface:
 
         """
 
+        logger = logging.getLogger()
+        logger.setLevel(log_level)
+        # remove default handler
+        CommonInterface._remove_handlers(logger)
+        for h in CommonInterface._build_std_handlers():
+            logger.addHandler(h)
+
+        return logger
+
+    @staticmethod
+    def _build_std_handlers() -> List[logging.Handler]:
+        """
+        Console handlers: DEBUG and INFO records go to stdout, WARNING and above to stderr.
+        """
+
         class InfoFilter(logging.Filter):
             def filter(self, rec):
                 return rec.levelno in (logging.DEBUG, logging.INFO)
@@ -167,16 +188,13 @@ class CommonInterface:
         hd1.addFilter(InfoFilter())
         hd2 = logging.StreamHandler(sys.stderr)
         hd2.setLevel(logging.WARNING)
+        return [hd1, hd2]
 
-        logging.getLogger().setLevel(log_level)
-        # remove default handler
-        for h in logging.getLogger().handlers:
-            logging.getLogger().removeHandler(h)
-        logging.getLogger().addHandler(hd1)
-        logging.getLogger().addHandler(hd2)
-
-        logger = logging.getLogger()
-        return logger
+    @staticmethod
+    def _remove_handlers(logger: logging.Logger):
+        # iterate over a copy, removing from the live list while iterating would skip every other handler
+        for h in logger.handlers[:]:
+            logger.removeHandler(h)
 
     @staticmethod
     def set_gelf_logger(log_level: int = logging.INFO, transport_layer='TCP',
@@ -196,28 +214,26 @@ class CommonInterface:
 
         Returns: Logger object
         """
+        logger = logging.getLogger()
         # remove existing handlers
-        for h in logging.getLogger().handlers:
-            logging.getLogger().removeHandler(h)
+        CommonInterface._remove_handlers(logger)
         if stdout:
-            CommonInterface.set_default_logger(log_level)
+            for h in CommonInterface._build_std_handlers():
+                logger.addHandler(h)
 
         # gelf handler setup
-        gelf_kwargs['include_extra_fields'] = include_extra_fields
-
         host = os.getenv('KBC_LOGGER_ADDR', 'localhost')
         port = os.getenv('KBC_LOGGER_PORT', 12201)
         if transport_layer == 'TCP':
-            gelf = GelfTcpHandler(host=host, port=port, **gelf_kwargs)
+            gelf = GelfTcpHandler(host=host, port=port, include_extra_fields=include_extra_fields, **gelf_kwargs)
         elif transport_layer == 'UDP':
-            gelf = GelfUdpHandler(host=host, port=port, **gelf_kwargs)
+            gelf = GelfUdpHandler(host=host, port=port, include_extra_fields=include_extra_fields, **gelf_kwargs)
         else:
             raise ValueError(F'Unsupported gelf transport layer: {transport_layer}. Choose TCP or UDP')
 
-        logging.getLogger().setLevel(log_level)
-        logging.getLogger().addHandler(gelf)
+        logger.setLevel(log_level)
+        logger.addHandler(gelf)
 
-        logger = logging.getLogger()
         return logger
 
     def get_state_file(self) -> dict:
@@ -230,14 +246,11 @@ class CommonInterface:
 
         """
         logging.info('Loading state file..')
-        state_file_path = os.path.join(self.data_folder_path, 'in', 'state.json')
-        if not os.path.isfile(state_file_path):
+        try:
+            return _json.load_file(self._state_in_path)
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
             logging.info('State file not found. First run?')
             return {}
-        try:
-            with open(state_file_path, 'r') \
-                    as state_file:
-                return json.load(state_file)
         except (OSError, IOError):
             raise ValueError(
                 "State file state.json unable to read "
@@ -252,8 +265,7 @@ class CommonInterface:
         if not isinstance(state_dict, dict):
             raise TypeError('Dictionary expected as a state file datatype!')
 
-        with open(os.path.join(self.configuration.data_dir, 'out', 'state.json'), 'w+') as state_file:
-            json.dump(state_dict, state_file)
+        _json.dump_file(state_dict, self._state_out_path)
 
     def get_input_table_definition_by_name(self, table_name: str) -> dao.TableDefinition:
         """
@@ -287,7 +299,7 @@ class CommonInterface:
         By default, orphaned manifests are skipped.
 
 
-        See Also: keboola.component.dao.dao.TableDefinition
+        See Also: keboola.component.dao.dao.TableDefinition, iter_input_tables_definitions
 
         Args:
             orphaned_manifests (bool): If True, manifests without corresponding files are fetched. This is useful in
@@ -298,35 +310,54 @@ class CommonInterface:
         Returns: List[dao.TableDefinition]
 
         """
+        return list(self.iter_input_tables_definitions(orphaned_manifests=orphaned_manifests))
 
-        table_files = [f for f in glob.glob(self.tables_in_path + "/**", recursive=False) if
-                       not f.endswith('.manifest')]
-        table_defs = list()
-        for t in table_files:
-            p = Path(t)
-            manifest_path = t + '.manifest'
+    def iter_input_tables_definitions(self, orphaned_manifests=False) -> Iterator[dao.TableDefinition]:
+        """
+        Yield dao.TableDefinition objects by scanning the `data/in/tables` folder.
 
-            if p.is_dir() and not Path(manifest_path).exists():
+        Same as `get_input_tables_definitions` but the definitions are built one by one as they are consumed,
+        so only a single manifest is held in memory at a time. Useful for workspaces with large number of tables.
+
+        Args:
+            orphaned_manifests (bool): If True, manifests without corresponding files are fetched as well.
+
+        Returns: Iterator[dao.TableDefinition]
+
+        """
+
+        # single directory read, the entries carry the file type so no extra stat calls are needed
+        entries = []
+        if os.path.isdir(self.tables_in_path):
+            with os.scandir(self.tables_in_path) as it:
+                entries = [e for e in it if not e.name.startswith('.')]
+        entry_names = {e.name for e in entries}
+
+        files_w_manifest = set()
+        for entry in entries:
+            if entry.name.endswith('.manifest'):
+                continue
+            manifest_name = entry.name + '.manifest'
+
+            if entry.is_dir() and manifest_name not in entry_names:
                 # skip folders that do not have matching manifest
-                logging.warning(f'Folder {t} does not have matching manifest, it will be ignored!')
+                logging.warning(f'Folder {entry.path} does not have matching manifest, it will be ignored!')
                 continue
 
-            table_defs.append(dao.TableDefinition.build_from_manifest(manifest_path))
+            files_w_manifest.add(manifest_name)
+            yield dao.TableDefinition.build_from_manifest(os.path.join(self.tables_in_path, manifest_name))
 
         if orphaned_manifests:
-            files_w_manifest = [t.name + '.manifest' for t in table_defs]
-            manifest_files = [f for f in glob.glob(self.tables_in_path + "/**.manifest", recursive=False)
-                              if Path(f).name not in files_w_manifest]
-            for t in manifest_files:
-                p = Path(t)
+            for entry in entries:
+                if not entry.name.endswith('.manifest') or entry.name in files_w_manifest:
+                    continue
 
-                if p.is_dir():
+                if entry.is_dir():
                     # skip folders that do not have matching manifest
-                    logging.warning(f'Manifest {t} is folder,s skipping!')
+                    logging.warning(f'Manifest {entry.path} is folder,s skipping!')
                     continue
 
-                table_defs.append(dao.TableDefinition.build_from_manifest(t))
-        return table_defs
+                yield dao.TableDefinition.build_from_manifest(entry.path)
 
     def _create_table_definition(self, name: str,
                                  storage_stage: str = 'out',
@@ -542,9 +573,7 @@ class CommonInterface:
             tag_group_v1 = f.tags if include_system_tags else f.user_tags
             tag_group_v1.sort()
             tag_group_key = ';'.join(tag_group_v1)
-            if not files_per_tag.get(tag_group_key):
-                files_per_tag[tag_group_key] = []
-            files_per_tag[tag_group_key].append(f)
+            files_per_tag.setdefault(tag_group_key, []).append(f)
         return files_per_tag
 
     def _filter_files(self, file_definitions: List[dao.FileDefinition], tags: List[str] = None,
@@ -570,9 +599,7 @@ class CommonInterface:
     def __group_files_by_name(self, file_definitions: List[dao.FileDefinition]) -> Dict[str, List[dao.FileDefinition]]:
         files_per_name: dict = {}
         for f in file_definitions:
-            if not files_per_name.get(f.name):
-                files_per_name[f.name] = []
-            files_per_name[f.name].append(f)
+            files_per_name.setdefault(f.name, []).append(f)
         return files_per_name
 
     def __filter_filedefs_by_latest(self, file_definitions: List[dao.FileDefinition]) -> List[dao.FileDefinition]:
@@ -862,22 +889,19 @@ class CommonInterface:
 
     def _validate_par_group(self, par_group, parameters):
         missing_fields = []
-        is_present = False
         for par in par_group:
             if isinstance(par, list):
                 missing_subset = self._get_par_missing_fields(par, parameters)
-                missing_fields.extend(missing_subset)
                 if not missing_subset:
-                    is_present = True
+                    # OR group is satisfied, no need to check the rest
+                    return []
+                missing_fields.extend(missing_subset)
 
             elif parameters.get(par):
-                is_present = True
+                return []
             else:
                 missing_fields.append(par)
-        if not is_present:
-            return missing_fields
-        else:
-            return []
+        return missing_fields
 
     def _get_par_missing_fields(self, mand_params, parameters):
         missing_fields = []
@@ -888,11 +912,12 @@ class CommonInterface:
 
     # ### PROPERTIES
     @property
-    def configuration(self):
-        # try to load the configuration
+    def configuration(self) -> Configuration:
+        # try to load the configuration, parsed only once unless the data folder changes
         # raises ValueError
-
-        return Configuration(self.data_folder_path)
+        if self._configuration is None or self._configuration.data_dir != self.data_folder_path:
+            self._configuration = Configuration(self.data_folder_path)
+        return self._configuration
 
     @property
     def tables_out_path(self):
@@ -910,6 +935,14 @@ class CommonInterface:
     def files_in_path(self):
         return os.path.join(self.data_folder_path, 'in', 'files')
 
+    @property
+    def _state_in_path(self):
+        return os.path.join(self.data_folder_path, 'in', 'state.json')
+
+    @property
+    def _state_out_path(self):
+        return os.path.join(self.data_folder_path, 'out', 'state.json')
+
     @property
     def _running_in_kbc(self):
         return self.environment_variables.stack_id or False
@@ -969,8 +1002,7 @@ class CommonInterface:
                                                          legacy_manifest=legacy_manifest)
         # make dirs if not exist
         os.makedirs(os.path.dirname(io_definition.full_path), exist_ok=True)
-        with open(io_definition.full_path + '.manifest', 'w') as manifest_file:
-            json.dump(manifest, manifest_file)
+        _json.dump_file(manifest, io_definition.full_path + '.manifest')
 
     def _expects_legacy_manifest(self) -> bool:
         legacy_manifest = \
@@ -1101,9 +1133,7 @@ class Configuration:
         self.data_dir = data_folder_path
 
         try:
-            with open(os.path.join(data_folder_path, 'config.json'), 'r') \
-                    as config_file:
-                self.config_data = json.load(config_file)
+            self.config_data = _json.load_file(os.path.join(data_folder_path, 'config.json'))
         except (OSError, IOError):
             raise ValueError(
                 f"Configuration file config.json not found, verify that the data directory is correct and that the "
@@ -1115,6 +1145,8 @@ class Configuration:
         self.image_parameters = self.config_data.get('image_parameters', {})
         self.action = self.config_data.get('action', '')
         self.workspace_credentials = self.config_data.get('authorization', {}).get('workspace', {})
+        # parsed input / output mappings, built lazily on first access
+        self._mappings_cache = {}
 
     # ################ PROPERTIES
     @property
@@ -1131,7 +1163,7 @@ class Configuration:
             credentials = dao.OauthCredentials(
                 id=oauth_credentials.get("id", ''),
                 created=oauth_credentials.get("created", ''),
-                data=json.loads(oauth_credentials.get("#data", '{}')),
+                data=_json.loads(oauth_credentials.get("#data", "{}")),
                 oauthVersion=oauth_credentials.get("oauthVersion", ''),
                 appKey=oauth_credentials.get("appKey", ''),
                 appSecret=oauth_credentials.get("#appSecret", '')
@@ -1149,12 +1181,16 @@ class Configuration:
 
         """
 
+        if 'tables_input' in self._mappings_cache:
+            return self._mappings_cache['tables_input']
+
         tables_defs = self.config_data.get('storage', {}).get('input', {}).get('tables', [])
         tables = []
         for table in tables_defs:
-            # nested dataclass
-            table['column_types'] = [dao.build_dataclass_from_dict(dao.TableColumnTypes, coltype) for coltype in
-                                     table.get('column_types', [])]
+            # nested dataclass, do not modify the raw config data
+            table = {**table,
+                     'column_types': [dao.build_dataclass_from_dict(dao.TableColumnTypes, coltype) for coltype in
+                                      table.get('column_types', [])]}
 
             im = dao.build_dataclass_from_dict(dao.TableInputMapping, table)
             im.full_path = os.path.normpath(
@@ -1166,6 +1202,7 @@ class Configuration:
                 )
             )
             tables.append(im)
+        self._mappings_cache['tables_input'] = tables
         return tables
 
     @property
@@ -1178,11 +1215,12 @@ class Configuration:
         Returns: List[TableOutputMapping]
 
         """
+        if 'tables_output' in self._mappings_cache:
+            return self._mappings_cache['tables_output']
+
         tables_defs = self.config_data.get('storage', {}).get('output', {}).get('tables', [])
-        tables = []
-        for table in tables_defs:
-            om = dao.build_dataclass_from_dict(dao.TableOutputMapping, table)
-            tables.append(om)
+        tables = [dao.build_dataclass_from_dict(dao.TableOutputMapping, table) for table in tables_defs]
+        self._mappings_cache['tables_output'] = tables
         return tables
 
     @property
@@ -1195,11 +1233,12 @@ class Configuration:
         Returns: List[FileInputMapping]
 
         """
-        defs = self.config_data.get('storage', {}).get('output', {}).get('files', [])
-        files = []
-        for file in defs:
-            om = dao.build_dataclass_from_dict(dao.FileInputMapping, file)
-            files.append(om)
+        if 'files_input' in self._mappings_cache:
+            return self._mappings_cache['files_input']
+
+        defs = self.config_data.get('storage', {}).get('input', {}).get('files', [])
+        files = [dao.build_dataclass_from_dict(dao.FileInputMapping, file) for file in defs]
+        self._mappings_cache['files_input'] = files
         return files
 
     @property
@@ -1212,9 +1251,10 @@ class Configuration:
         Returns:
 
         """
+        if 'files_output' in self._mappings_cache:
+            return self._mappings_cache['files_output']
+
         defs = self.config_data.get('storage', {}).get('output', {}).get('files', [])
-        files = []
-        for file in defs:
-            om = dao.build_dataclass_from_dict(dao.FileOutputMapping, file)
-            files.append(om)
+        files = [dao.build_dataclass_from_dict(dao.FileOutputMapping, file) for file in defs]
+        self._mappings_cache['files_output'] = files
         return files
@@ -26,13 +26,33 @@ class SyncActionResult(ABC):
         self.status = 'success'
 
     def __str__(self):
+        return json.dumps(self._to_dict())
+
+    def _to_dict(self) -> dict:
         # the None values / attributes will be ignored.
-        dict_obj = dataclasses.asdict(self, dict_factory=lambda x: {k: v for (k, v) in x if
-                                                                    v is not None})
+        dict_obj = _dataclass_to_dict(self)
         # hack to add default status
         if self.status:
             dict_obj['status'] = self.status
-        return json.dumps(dict_obj)
+        return dict_obj
+
+
+def _dataclass_to_dict(obj) -> dict:
+    # converts like dataclasses.asdict with the None values dropped, the leaf values are not deep-copied
+    values = ((field.name, getattr(obj, field.name)) for field in dataclasses.fields(obj))
+    return {k: _to_json_value(v) for k, v in values if v is not None}
+
+
+def _to_json_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _dataclass_to_dict(value)
+    if isinstance(value, (list, tuple)):
+        return [_to_json_value(v) for v in value]
+    if isinstance(value, dict):
+        return {_to_json_value(k): _to_json_value(v) for k, v in value.items()}
+    return value
 
 
 # str base so it is serialised properly
@@ -75,7 +95,8 @@ def process_sync_action_result(result: Union[None, List[dict], dict, SyncActionR
     if isinstance(result, SyncActionResult):
         result_str = str(result)
     elif isinstance(result, list):
-        result_str = f'[{", ".join([json.dumps(r) if isinstance(r, dict) else str(r) for r in result])}]'
+        # single encoder call for the whole list
+        result_str = json.dumps([r._to_dict() if isinstance(r, SyncActionResult) else r for r in result])
     elif result is None:
         result_str = json.dumps({'status': 'success'})
     elif isinstance(result, dict):
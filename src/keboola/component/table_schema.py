@@ -1,8 +1,11 @@
+from operator import attrgetter
 from typing import List, Dict
 from typing import Optional, Union
 from keboola.component.dao import SupportedDataTypes
 from dataclasses import dataclass
 
+_get_name = attrgetter('name')
+
 
 @dataclass
 class FieldSchema:
@@ -30,7 +33,7 @@ class TableSchema:
 
     @property
     def field_names(self) -> List[str]:
-        return [column.name for column in self.fields]
+        return list(map(_get_name, self.fields))
 
     @property
     def csv_name(self) -> str:
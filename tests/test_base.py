@@ -1,5 +1,7 @@
+import json
 import os
 import unittest
+from contextlib import redirect_stdout
 from io import StringIO
 from unittest.mock import patch
 
@@ -7,6 +9,14 @@ from keboola.component import UserException
 from keboola.component.base import ComponentBase, sync_action
 from keboola.component.sync_actions import SelectElement
 
+DATA_EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples')
+DATA_1_DIR = os.path.join(DATA_EXAMPLES_DIR, 'data1')
+DATA_CUSTOM_ACTION_DIR = os.path.join(DATA_EXAMPLES_DIR, 'data_custom_action')
+
+EXPECTED_TEST_SELECT = [SelectElement("test")]
+EXPECTED_COLUMNS = [SelectElement("value_a", "label_a"), SelectElement("value_b")]
+EXPECTED_COLUMNS_OUTPUT = [{"value": "value_a", "label": "label_a"}, {"value": "value_b", "label": "value_b"}]
+
 
 class MockComponent(ComponentBase):
     def run(self):
@@ -18,12 +28,72 @@ class MockComponentFail(ComponentBase):
         raise UserException("Failed")
 
 
+class CustomActionSelectComponent(ComponentBase):
+    def run(self):
+        pass
+
+    @sync_action('custom_action')
+    def test_action(self):
+        return [SelectElement("test")]
+
+
+class CustomActionColumnsComponent(ComponentBase):
+    def run(self):
+        pass
+
+    @sync_action('custom_action')
+    def get_columns(self):
+        return EXPECTED_COLUMNS
+
+
+class FirstActionComponent(ComponentBase):
+    def run(self):
+        pass
+
+    @sync_action('custom_action')
+    def first_action(self):
+        return [SelectElement("first")]
+
+
+class SecondActionComponent(ComponentBase):
+    def run(self):
+        pass
+
+    @sync_action('custom_action')
+    def second_action(self):
+        return [SelectElement("second")]
+
+
+class UndecoratedActionComponent(ComponentBase):
+    def run(self):
+        pass
+
+    # same names as the actions of the classes above, but not registered as sync actions here
+    def first_action(self):
+        return [SelectElement("first")]
+
+    def second_action(self):
+        return [SelectElement("second")]
+
+
+def define_invalid_action_name_component():
+    class ComponentInvalidActionName(ComponentBase):
+        def run(self):
+            pass
+
+        @sync_action('run')
+        def test_action(self):
+            pass
+
+    return ComponentInvalidActionName
+
+
 class TestCommonInterface(unittest.TestCase):
 
     def setUp(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data1')
-        os.environ["KBC_DATADIR"] = path
+        env_patcher = patch.dict(os.environ, {'KBC_DATADIR': DATA_1_DIR})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
 
     def test_default_arguments_pass(self):
         MockComponent()
@@ -38,9 +108,7 @@ class TestCommonInterface(unittest.TestCase):
             c.execute_action()
 
     def test_missing_action_fail(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data_custom_action')
-        os.environ["KBC_DATADIR"] = path
+        os.environ['KBC_DATADIR'] = DATA_CUSTOM_ACTION_DIR
         with self.assertRaises(AttributeError):
             MockComponent().execute_action()
 
@@ -48,59 +116,30 @@ class TestCommonInterface(unittest.TestCase):
         self.assertEqual(MockComponent().execute_action(), 'run_executed')
 
     def test_custom_action_passes(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data_custom_action')
-        os.environ["KBC_DATADIR"] = path
-
-        class CustomActionComponent(ComponentBase):
-            def run(self):
-                pass
+        os.environ['KBC_DATADIR'] = DATA_CUSTOM_ACTION_DIR
+        self.assertEqual(CustomActionSelectComponent().execute_action(), EXPECTED_TEST_SELECT)
 
-            @sync_action('custom_action')
-            def test_action(self):
-                return [SelectElement("test")]
-
-        self.assertEqual(CustomActionComponent().execute_action(), [SelectElement("test")])
+    def test_custom_action_mapped_per_component_class(self):
+        os.environ['KBC_DATADIR'] = DATA_CUSTOM_ACTION_DIR
+        self.assertEqual(FirstActionComponent().execute_action(), [SelectElement("first")])
+        self.assertEqual(SecondActionComponent().execute_action(), [SelectElement("second")])
+        with self.assertRaises(AttributeError):
+            UndecoratedActionComponent().execute_action()
 
     def test_run_action_fails_with_user_error(self):
         with self.assertRaises(UserException):
             MockComponentFail().execute_action()
 
     def test_system_action_name_fail(self):
-        with self.assertRaises(ValueError):
-            class ComponentInvalidActionName(ComponentBase):
-                def run(self):
-                    pass
-
-                @sync_action('run')
-                def test_action(self):
-                    pass
-
-            path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                'data_examples', 'data_custom_action')
-            os.environ["KBC_DATADIR"] = path
-
-            ComponentInvalidActionName().execute_action()
-
-    @patch('sys.stdout', new_callable=StringIO)
-    def test_sync_action_prints_valid_message(self, stdout):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data_custom_action')
-        os.environ["KBC_DATADIR"] = path
-
-        class CustomActionComponent(ComponentBase):
-            def run(self):
-                pass
-
-            @sync_action('custom_action')
-            def get_columns(self):
-                return [SelectElement("value_a", "label_a"),
-                        SelectElement("value_b")
-                        ]
-
-        CustomActionComponent().execute_action()
-        expected = '[{"value": "value_a", "label": "label_a"}, {"value": "value_b", "label": "value_b"}]'
-        self.assertEqual(stdout.getvalue(), expected)
+        self.assertRaises(ValueError, define_invalid_action_name_component)
+
+    def test_sync_action_prints_valid_message(self):
+        os.environ['KBC_DATADIR'] = DATA_CUSTOM_ACTION_DIR
+
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            CustomActionColumnsComponent().execute_action()
+        self.assertEqual(json.loads(stdout.getvalue()), EXPECTED_COLUMNS_OUTPUT)
 
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+import json
 import os
 import tempfile
 import unittest
@@ -5,6 +6,11 @@ import unittest
 from keboola.component import dao
 from keboola.component.dao import *
 
+DATA_EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples')
+DATA_1_DIR = os.path.join(DATA_EXAMPLES_DIR, 'data1')
+DATA_1_IN_TABLES_DIR = os.path.join(DATA_1_DIR, 'in', 'tables')
+DATA_1_IN_FILES_DIR = os.path.join(DATA_1_DIR, 'in', 'files')
+
 
 class TestTableMetadata(unittest.TestCase):
 
@@ -91,8 +97,33 @@ class TestTableMetadata(unittest.TestCase):
 
     def test_invalid_datatype_fails(self):
         tmetadata = TableMetadata()
-        with self.assertRaises(ValueError) as ctx:
-            tmetadata.add_column_data_type('col', 'invalid type')
+        for data_type in ('invalid type', {'type': 'STRING'}, ['STRING'], None):
+            with self.subTest(data_type=data_type), self.assertRaises(ValueError):
+                tmetadata.add_column_data_type('col', data_type)
+
+    def test_invalid_datatypes_fail_without_partial_update(self):
+        tmetadata = TableMetadata()
+        with self.assertRaises(ValueError):
+            tmetadata.add_column_data_types({"col_1": "NUMERIC", "col_2": "invalid type"})
+        with self.assertRaisesRegex(ValueError, r'"\[\'STRING\'\]" is not valid'):
+            tmetadata.add_column_data_types({"col_1": "NUMERIC", "col_2": ["STRING"], "col_3": ["STRING"]})
+
+        self.assertDictEqual({}, tmetadata.column_metadata)
+
+    def test_columns_metadata_by_key(self):
+        tmetadata = TableMetadata()
+        tmetadata.add_column_data_types({"col_1": "NUMERIC", "col_2": "STRING"})
+        tmetadata.add_column_descriptions({"col_1": "Description"})
+
+        self.assertDictEqual({"col_1": "NUMERIC", "col_2": "STRING"}, tmetadata.column_datatypes)
+        self.assertDictEqual({"col_1": "Description"}, tmetadata.column_descriptions)
+
+    def test_add_multiple_column_metadata(self):
+        tmetadata = TableMetadata()
+        tmetadata.add_multiple_column_metadata({"col_1": [{"foo": "bar"}, {"baz": "qux"}],
+                                                "col_2": [{"foo": None}]})
+
+        self.assertDictEqual({"col_1": {"foo": "bar", "baz": "qux"}}, tmetadata.column_metadata)
 
     def test_table_description_metadata_for_legacy_manifest_is_valid(self):
         tmetadata = TableMetadata()
@@ -155,8 +186,36 @@ class TestTableMetadata(unittest.TestCase):
         self.assertDictEqual({}, table_def.table_metadata.column_metadata)
 
 
+class TestKBCTimestamp(unittest.TestCase):
+
+    def test_parse_kbc_timestamp_equals_strptime(self):
+        for value in ("2015-11-02T09:11:37+0100", "2015-11-02T09:11:37-0530", "2015-11-02T09:11:37Z"):
+            with self.subTest(value=value):
+                self.assertEqual(datetime.strptime(value, dao.KBC_DEFAULT_TIME_FORMAT),
+                                 dao._parse_kbc_timestamp(value))
+
+    def test_parse_kbc_timestamp_invalid_fails(self):
+        with self.assertRaises(ValueError):
+            dao._parse_kbc_timestamp("2015-11-02")
+
+
 class TestTableDefinition(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp_dir = tempfile.TemporaryDirectory(prefix='kbc-test')
+        # definitions shared by the tests that only read them
+        cls.sample_td = TableDefinition.build_from_manifest(os.path.join(DATA_1_IN_TABLES_DIR, 'sample.csv.manifest'))
+        cls.sliced_td = TableDefinition.build_from_manifest(os.path.join(DATA_1_IN_TABLES_DIR, 'sliced.csv.manifest'))
+        cls.orphaned_td = TableDefinition.build_from_manifest(os.path.join(DATA_1_IN_TABLES_DIR,
+                                                                           'orphaned.csv.manifest'))
+        cls.orphaned_manifest_td = TableDefinition.build_from_manifest(os.path.join(DATA_1_IN_TABLES_DIR,
+                                                                                    'orphaned_manifest.csv.manifest'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp_dir.cleanup()
+
     def test_legacy_order_out(self):
         table_def = TableDefinition("testDef", "somepath", False, 'some-destination', ['foo'], ['foo', 'bar'], True,
                                     TableMetadata(), '"', ',',
@@ -193,17 +252,11 @@ class TestTableDefinition(unittest.TestCase):
             table_def.get_manifest_dictionary(legacy_manifest=True))
 
     def test_out_old_to_new_has_headers_sliced(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'tables')
-
-        table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'sliced.csv.manifest'))
-
-        manifest = table_def.get_manifest_dictionary()
+        manifest = self.sliced_td.get_manifest_dictionary()
         self.assertEqual(manifest['has_header'], False)
 
     def test_out_old_to_new_has_headers_columns(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'tables')
+        sample_path = DATA_1_IN_TABLES_DIR
 
         table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'sample_output.csv.manifest'))
 
@@ -215,8 +268,7 @@ class TestTableDefinition(unittest.TestCase):
             TableDefinition("testDef", "somepath", primary_key=['foo'])
 
     def test_out_legacy_to_new_compatible(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'tables')
+        sample_path = DATA_1_IN_TABLES_DIR
 
         res = TableDefinition.build_from_manifest(os.path.join(sample_path, 'sample_output_header.csv.manifest'))
         res_manifest = res.get_manifest_dictionary()
@@ -288,7 +340,7 @@ class TestTableDefinition(unittest.TestCase):
             'delete_where_operator': 'eq'
         }
 
-        manifest_file = os.path.join(tempfile.mkdtemp('kbc-test') + 'table.manifest')
+        manifest_file = os.path.join(self._tmp_dir.name, 'table.manifest')
         with open(manifest_file, 'w') as out_f:
             json.dump(raw_manifest, out_f)
 
@@ -302,13 +354,10 @@ class TestTableDefinition(unittest.TestCase):
         self.assertEqual(table_def.table_metadata.column_metadata, expected_tmetadata.column_metadata)
         self.assertEqual(table_def.table_metadata.table_metadata, expected_tmetadata.table_metadata)
 
-        os.remove(manifest_file)
-
     def test_build_from_manifest_matching_table_valid_attributes(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'tables')
+        sample_path = DATA_1_IN_TABLES_DIR
 
-        table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'sample.csv.manifest'))
+        table_def = self.sample_td
 
         expected_table_def = TableDefinition(name='sample.csv',
                                              full_path=os.path.join(sample_path, 'sample.csv'),
@@ -320,10 +369,9 @@ class TestTableDefinition(unittest.TestCase):
         self.assertEqual(expected_table_def.is_sliced, table_def.is_sliced)
 
     def test_build_from_manifest_orphaned_table_valid_attributes(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'tables')
+        sample_path = DATA_1_IN_TABLES_DIR
 
-        table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'orphaned.csv.manifest'))
+        table_def = self.orphaned_td
 
         expected_table_def = TableDefinition(name='orphaned.csv',
                                              full_path=os.path.join(sample_path, 'orphaned.csv'),
@@ -337,10 +385,9 @@ class TestTableDefinition(unittest.TestCase):
         self.assertEqual(expected_table_def.get_manifest_dictionary(), table_def.get_manifest_dictionary())
 
     def test_build_from_manifest_sliced_table_valid_attributes(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'tables')
+        sample_path = DATA_1_IN_TABLES_DIR
 
-        table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'sliced.csv.manifest'))
+        table_def = self.sliced_td
 
         expected_table_def = TableDefinition(name='sliced.csv',
                                              full_path=os.path.join(sample_path, 'sliced.csv'),
@@ -352,10 +399,9 @@ class TestTableDefinition(unittest.TestCase):
         self.assertEqual(expected_table_def.is_sliced, table_def.is_sliced)
 
     def test_build_from_manifest_orphaned_manifest_valid_attributes(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'tables')
+        sample_path = DATA_1_IN_TABLES_DIR
 
-        table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'orphaned_manifest.csv.manifest'))
+        table_def = self.orphaned_manifest_td
 
         expected_table_def = TableDefinition(name='orphaned_manifest.csv',
                                              full_path=None,
@@ -401,41 +447,23 @@ class TestTableDefinition(unittest.TestCase):
             'enclosure': '"',
             'write_always': False
         }
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file_path = temp_file.name
-
-        with open(temp_file_path, 'w') as f:
+        manifest_file = os.path.join(self._tmp_dir.name, 'incremental_default.manifest')
+        with open(manifest_file, 'w') as f:
             json.dump(source_m, f)
-        td = TableDefinition.build_from_manifest(temp_file_path)
+        td = TableDefinition.build_from_manifest(manifest_file)
 
         self.assertEqual(td.incremental, False)
 
-    def test_table_manifest_error_destination(self):
-        with self.assertRaises(TypeError):
-            TableDefinition("testDef", "somepath", is_sliced=False, destination=['foo', 'bar'])
-
-    def test_table_manifest_error_primary_key(self):
-        with self.assertRaises(TypeError):
-            TableDefinition("testDef", "somepath", is_sliced=False, primary_key="column")
-
-    def test_table_manifest_error_columns(self):
-        with self.assertRaises(TypeError):
-            TableDefinition("testDef", "somepath", is_sliced=False, columns="column")
-
-    def test_table_manifest_error_column_delete_1(self):
-        with self.assertRaises(ValueError):
-            TableDefinition("testDef", "somepath", is_sliced=False, delete_where={"a": "b"})
-
-    def test_table_manifest_error_column_delete_2(self):
-        with self.assertRaises(TypeError):
-            TableDefinition("testDef", "somepath", is_sliced=False, delete_where={"column": "a",
-                                                                                  "values": "b"})
-
-    def test_table_manifest_error_column_delete_3(self):
-        with self.assertRaises(TypeError):
-            TableDefinition("testDef", "somepath", is_sliced=False, delete_where={"column": "a",
-                                                                                  "values": "b",
-                                                                                  "operator": "c"})
+    def test_table_manifest_invalid_arguments_fail(self):
+        cases = [({'destination': ['foo', 'bar']}, TypeError),
+                 ({'primary_key': 'column'}, TypeError),
+                 ({'columns': 'column'}, TypeError),
+                 ({'delete_where': {'a': 'b'}}, ValueError),
+                 ({'delete_where': {'column': 'a', 'values': 'b'}}, TypeError),
+                 ({'delete_where': {'column': 'a', 'values': 'b', 'operator': 'c'}}, TypeError)]
+        for kwargs, expected_exception in cases:
+            with self.subTest(**kwargs), self.assertRaises(expected_exception):
+                TableDefinition("testDef", "somepath", is_sliced=False, **kwargs)
 
     def test_unsupported_legacy_queue_properties_log(self):
         with self.assertLogs(level='WARNING') as log:
@@ -475,8 +503,6 @@ class TestTableDefinition(unittest.TestCase):
 
         self.maxDiff = None
 
-        os.environ['KBC_DATA_TYPE_SUPPORT'] = "authoritative"
-
         self.assertDictEqual({
             'destination': 'some-destination',
             'incremental': True,
@@ -496,8 +522,6 @@ class TestTableDefinition(unittest.TestCase):
             table_def.get_manifest_dictionary('out')
         )
 
-        del os.environ['KBC_DATA_TYPE_SUPPORT']
-
     def test_new_manifest_native_types(self):
         table_def = TableDefinition("testDef", "somepath", is_sliced=False,
                                     stage='out',
@@ -533,8 +557,6 @@ class TestTableDefinition(unittest.TestCase):
 
         self.maxDiff = None
 
-        os.environ['KBC_DATA_TYPE_SUPPORT'] = "authoritative"
-
         self.assertDictEqual({
             'destination': 'some-destination',
             'incremental': True,
@@ -556,8 +578,6 @@ class TestTableDefinition(unittest.TestCase):
             table_def.get_manifest_dictionary('out')
         )
 
-        del os.environ['KBC_DATA_TYPE_SUPPORT']
-
     def test_new_manifest_base_type_columns(self):
         table_def = TableDefinition("testDef", "somepath", is_sliced=False,
                                     destination='some-destination',
@@ -575,8 +595,6 @@ class TestTableDefinition(unittest.TestCase):
 
         table_def.add_column('id', ColumnDefinition(primary_key=True, data_types=BaseType.integer(length='200')))
 
-        os.environ['KBC_DATA_TYPE_SUPPORT'] = "hints"
-
         self.assertDictEqual(
             {'destination': 'some-destination', 'incremental': True, 'write_always': False, 'delimiter': ',',
              'enclosure': '"', 'manifest_type': 'out', 'has_header': True, 'delete_where_column': 'lilly',
@@ -604,8 +622,6 @@ class TestTableDefinition(unittest.TestCase):
             table_def.get_manifest_dictionary('out')
         )
 
-        del os.environ['KBC_DATA_TYPE_SUPPORT']
-
     def test_new_manifest_column_methods(self):
         table_def = TableDefinition("testDef", "somepath",
                                     stage='out',
@@ -642,9 +658,33 @@ class TestTableDefinition(unittest.TestCase):
                         {'name': 'note', 'data_type': {'base': {'type': 'STRING'}}}]},
             table_def.get_manifest_dictionary())
 
+    def test_new_manifest_bulk_column_methods(self):
+        table_def = TableDefinition("testDef", "somepath", stage='out', schema=['foo'])
+
+        table_def.add_columns(['bar', 'baz'])
+        table_def.schema['bar'].add_datatype('redshift', DataType(dtype='STRING', length='255'))
+        table_def.update_columns({'foo': ColumnDefinition(data_types=BaseType.integer())})
+        table_def.delete_columns(['baz'])
+
+        self.assertEqual(['foo', 'bar'], list(table_def.schema))
+        self.assertEqual('INTEGER', table_def.schema['foo'].data_types['base'].dtype)
+        self.assertIn('redshift', table_def.schema['bar'].data_types)
+
+        table_def.add_column('new')
+        self.assertNotIn('redshift', table_def.schema['new'].data_types)
+
+    def test_add_column_default_definition_not_shared(self):
+        table_def = TableDefinition("testDef", "somepath", stage='out')
+
+        table_def.add_column('foo')
+        table_def.add_column('bar')
+        table_def.schema['foo'].update_properties(nullable=False, primary_key=True)
+
+        self.assertIsNot(table_def.schema['foo'], table_def.schema['bar'])
+        self.assertEqual(ColumnDefinition(), table_def.schema['bar'])
+
     def test_build_from_manifest_full_input(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data_full_input_manifest', 'in', 'tables')
+        sample_path = os.path.join(DATA_EXAMPLES_DIR, 'data_full_input_manifest', 'in', 'tables')
 
         table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'sample.csv.manifest'))
 
@@ -665,36 +705,31 @@ class TestTableDefinition(unittest.TestCase):
                                                   'Urban', 'US', 'High'])
 
     def test_build_from_manifest_full_output(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data_full_output_manifest', 'in', 'tables')
+        sample_path = os.path.join(DATA_EXAMPLES_DIR, 'data_full_output_manifest', 'in', 'tables')
 
         table_def = TableDefinition.build_from_manifest(os.path.join(sample_path, 'sample_output.csv.manifest'))
 
-        self.assertEqual(table_def.name, 'sample_output.csv')
-        self.assertEqual(table_def.destination, 'out.c-adform_masterdata-processor-test.sample_output')
-        self.assertEqual(table_def.column_names, ['x', 'Sales', 'CompPrice', 'Income', 'Advertising',
-                                                  'Population', 'Price', 'ShelveLoc', 'Age', 'Education',
-                                                  'Urban', 'US', 'High'])
-        self.assertEqual(table_def.incremental, True)
-        self.assertEqual(table_def.primary_key, ['x'])
-        self.assertEqual(table_def.write_always, True)
-        self.assertEqual(table_def.delimiter, '\t')
-        self.assertEqual(table_def.enclosure, '\'')
+        expected = {'name': 'sample_output.csv',
+                    'destination': 'out.c-adform_masterdata-processor-test.sample_output',
+                    'column_names': ['x', 'Sales', 'CompPrice', 'Income', 'Advertising', 'Population', 'Price',
+                                     'ShelveLoc', 'Age', 'Education', 'Urban', 'US', 'High'],
+                    'incremental': True,
+                    'primary_key': ['x'],
+                    'write_always': True,
+                    'delimiter': '\t',
+                    'enclosure': '\'',
+                    'delete_where_column': 'Advertising',
+                    'delete_where_values': ['Video', 'Search'],
+                    'delete_where_operator': 'eq'}
+
+        self.assertDictEqual(expected, {key: getattr(table_def, key) for key in expected})
         self.assertEqual(table_def.table_metadata.column_metadata, {'x': {'foo': 'gogo'}})
-        self.assertEqual(table_def.delete_where_column, 'Advertising')
-        self.assertEqual(table_def.delete_where_values, ['Video', 'Search'])
-        self.assertEqual(table_def.delete_where_operator, 'eq')
 
 
 class TestFileDefinition(unittest.TestCase):
 
-    def setUp(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data1')
-        os.environ["KBC_DATADIR"] = path
-
     def test_file_manifest_minimal(self):
-        file_path = os.path.join(os.environ["KBC_DATADIR"], 'in', 'files', '151971405_21702.strip.print.gif')
+        file_path = os.path.join(DATA_1_IN_FILES_DIR, '151971405_21702.strip.print.gif')
         file_def = FileDefinition(file_path)
 
         self.assertDictEqual(
@@ -728,8 +763,7 @@ class TestFileDefinition(unittest.TestCase):
         self.assertEqual(file_def.id, '123')
 
     def test_file_output_manifest_ignores_unrecognized(self):
-        file_path = os.path.join(os.environ["KBC_DATADIR"], 'in', 'files',
-                                 '151971405_21702.strip.print.gif.manifest')
+        file_path = os.path.join(DATA_1_IN_FILES_DIR, '151971405_21702.strip.print.gif.manifest')
         file_def = FileDefinition.build_from_manifest(file_path)
 
         # change stage
@@ -742,12 +776,13 @@ class TestFileDefinition(unittest.TestCase):
         )
 
     def test_build_from_manifest_matching_file_valid_attributes(self):
-        sample_path = os.path.join(os.environ["KBC_DATADIR"], 'in', 'files', '151971405_21702.strip.print.gif')
+        sample_path = os.path.join(DATA_1_IN_FILES_DIR, '151971405_21702.strip.print.gif')
         manifest_path = sample_path + '.manifest'
         file_def = FileDefinition.build_from_manifest(
             manifest_path)
 
-        expected_manifest = json.load(open(manifest_path))
+        with open(manifest_path, 'rb') as manifest_file:
+            expected_manifest = json.loads(manifest_file.read())
 
         self.assertEqual(sample_path, file_def.full_path)
         self.assertEqual(expected_manifest['name'], file_def.name)
@@ -760,8 +795,7 @@ class TestFileDefinition(unittest.TestCase):
         self.assertEqual(expected_manifest['size_bytes'], file_def.size_bytes)
 
     def test_build_from_manifest_nonexistentfile_fails(self):
-        sample_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                   'data_examples', 'data1', 'in', 'files')
+        sample_path = DATA_1_IN_FILES_DIR
 
         with self.assertRaises(ValueError):
             FileDefinition.build_from_manifest(os.path.join(sample_path, 'orphaned.csv.manifest'))
@@ -1,18 +1,63 @@
+import copy
 import json
+import logging
 import os
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 
 from keboola.component import CommonInterface, Configuration
+from keboola.component.dao import FileInputMapping, TableDefinition
+
+DATA_EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples')
+DATA_1_DIR = os.path.join(DATA_EXAMPLES_DIR, 'data1')
+
+# columns of the sample.csv table used across the data folder examples
+SAMPLE_CSV_COLUMNS = ['x', 'Sales', 'CompPrice', 'Income', 'Advertising', 'Population', 'Price', 'ShelveLoc', 'Age',
+                      'Education', 'Urban', 'US', 'High']
 
 
 class TestCommonInterface(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # the tests write manifests and state files, keep them out of the fixture tree
+        cls._tmp_dir = tempfile.TemporaryDirectory(prefix='kbc-test')
+        cls._data_1_dir = shutil.copytree(DATA_1_DIR, os.path.join(cls._tmp_dir.name, 'data1'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp_dir.cleanup()
+
     def setUp(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data1')
-        os.environ["KBC_DATADIR"] = path
-        os.environ['KBC_STACKID'] = 'connection.keboola.com'
-        os.environ['KBC_PROJECT_FEATURE_GATES'] = 'queuev2'
+        # restore the environment after each test, the tests override these and other variables
+        env_patcher = patch.dict(os.environ, {'KBC_DATADIR': self._data_1_dir,
+                                              'KBC_STACKID': 'connection.keboola.com',
+                                              'KBC_PROJECT_FEATURE_GATES': 'queuev2'})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+
+    def _copy_data_dir(self, name: str) -> str:
+        """Copies the data folder example into a temporary directory removed after the test."""
+        tmp_dir = tempfile.TemporaryDirectory(prefix='kbc-test')
+        self.addCleanup(tmp_dir.cleanup)
+        return shutil.copytree(os.path.join(DATA_EXAMPLES_DIR, name), os.path.join(tmp_dir.name, name))
+
+    def _create_sample_out_table(self, ci: CommonInterface, **kwargs):
+        """Creates the out table definition shared by the manifest write tests, kwargs are passed through."""
+        out_table = ci.create_out_table_definition('some-table.csv',
+                                                   columns=['foo', 'bar'],
+                                                   destination='some-destination',
+                                                   primary_key=['foo'],
+                                                   incremental=True,
+                                                   delete_where={'column': 'lilly',
+                                                                 'values': ['a', 'b'],
+                                                                 'operator': 'eq'},
+                                                   **kwargs)
+        out_table.table_metadata.add_table_metadata('bar', 'kochba')
+        out_table.table_metadata.add_column_metadata('bar', 'foo', 'gogo')
+        return out_table
 
     def test_all_env_variables_initialized(self):
         # set all variables
@@ -44,9 +89,9 @@ class TestCommonInterface(unittest.TestCase):
         self.assertEqual(ci.environment_variables.logger_addr, 'KBC_LOGGER_ADDR')
         self.assertEqual(ci.environment_variables.logger_port, 'KBC_LOGGER_PORT')
 
+    @unittest.skip("Required parameters validation moved to ComponentBase, pending rewrite")
     def test_empty_required_params_pass(self):
-        c = CommonInterface
-        return True
+        pass
         # # set env
         # interface = CommonInterface(mandatory_params=[])
         # `
@@ -56,8 +101,9 @@ class TestCommonInterface(unittest.TestCase):
         # except Exception:  # noeq
         #     self.fail("validateConfig() fails on empty Parameters!")
 
+    @unittest.skip("Required parameters validation moved to ComponentBase, pending rewrite")
     def test_required_params_missing_fail(self):
-        return True
+        pass
         # set env - missing notbar
         # hdlr = CommonInterface(mandatory_params=['fooBar', 'notbar'])
         #
@@ -66,6 +112,7 @@ class TestCommonInterface(unittest.TestCase):
         #
         # self.assertEqual('Missing mandatory config parameters fields: [notbar] ', str(er.exception))
 
+    @unittest.skip("Not implemented")
     def test_unknown_config_tables_input_mapping_properties_pass(self):
         """Unknown properties in storage.intpu.tables will be ignored when getting dataclass"""
 
@@ -76,40 +123,46 @@ class TestCommonInterface(unittest.TestCase):
                 "The data directory does not exist"):
             CommonInterface()
 
+    def test_set_default_logger_replaces_all_handlers(self):
+        root = logging.getLogger()
+        # the root logger is global, restore it for the other tests
+        self.addCleanup(setattr, root, 'handlers', root.handlers[:])
+        self.addCleanup(root.setLevel, root.level)
+        for _ in range(3):
+            root.addHandler(logging.NullHandler())
+
+        logger = CommonInterface.set_default_logger()
+
+        self.assertEqual(2, len(logger.handlers))
+        self.assertFalse(any(isinstance(h, logging.NullHandler) for h in logger.handlers))
+
     # ########## PROPERTIES
 
     def test_missing_config(self):
-        os.environ["KBC_DATADIR"] = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                                 'data_examples')
+        os.environ["KBC_DATADIR"] = DATA_EXAMPLES_DIR
         with self.assertRaisesRegex(
                 ValueError,
                 "Configuration file config.json not found"):
             ci = CommonInterface()
             c = ci.configuration
 
-    def test_get_data_dir(self):
-        ci = CommonInterface()
-        self.assertEqual(os.getenv('KBC_DATADIR', ''), ci.data_folder_path)
-
-    def test_get_tables_out_dir(self):
-        ci = CommonInterface()
-        tables_out = os.path.join(os.getenv('KBC_DATADIR', ''), 'out', 'tables')
-        self.assertEqual(tables_out, ci.tables_out_path)
-
-    def test_get_tables_in_dir(self):
+    def test_configuration_parsed_once(self):
         ci = CommonInterface()
-        tables_out = os.path.join(os.getenv('KBC_DATADIR', ''), 'in', 'files')
-        self.assertEqual(tables_out, ci.files_in_path)
+        self.assertIs(ci.configuration, ci.configuration)
 
-    def test_get_files_out_dir(self):
+    def test_get_data_dir(self):
         ci = CommonInterface()
-        tables_out = os.path.join(os.getenv('KBC_DATADIR', ''), 'out', 'files')
-        self.assertEqual(tables_out, ci.files_out_path)
+        self.assertEqual(self._data_1_dir, ci.data_folder_path)
 
-    def test_get_files_in_dir(self):
+    def test_get_data_folder_subdirs(self):
         ci = CommonInterface()
-        tables_out = os.path.join(os.getenv('KBC_DATADIR', ''), 'in', 'tables')
-        self.assertEqual(tables_out, ci.tables_in_path)
+        expected_paths = {'tables_in_path': ('in', 'tables'),
+                          'tables_out_path': ('out', 'tables'),
+                          'files_in_path': ('in', 'files'),
+                          'files_out_path': ('out', 'files')}
+        for attribute, parts in expected_paths.items():
+            with self.subTest(attribute=attribute):
+                self.assertEqual(os.path.join(self._data_1_dir, *parts), getattr(ci, attribute))
 
     def test_legacy_queue(self):
         os.environ['KBC_PROJECT_FEATURE_GATES'] = ''
@@ -135,18 +188,7 @@ class TestCommonInterface(unittest.TestCase):
 
     def test_create_and_write_table_manifest_deprecated(self):
         ci = CommonInterface()
-        # create table def
-        out_table = ci.create_out_table_definition('some-table.csv',
-                                                   columns=['foo', 'bar'],
-                                                   destination='some-destination',
-                                                   primary_key=['foo'],
-                                                   incremental=True,
-                                                   delete_where={'column': 'lilly',
-                                                                 'values': ['a', 'b'],
-                                                                 'operator': 'eq'}
-                                                   )
-        out_table.table_metadata.add_table_metadata('bar', 'kochba')
-        out_table.table_metadata.add_column_metadata('bar', 'foo', 'gogo')
+        out_table = self._create_sample_out_table(ci)
 
         # write
         ci.write_tabledef_manifest(out_table)
@@ -170,24 +212,10 @@ class TestCommonInterface(unittest.TestCase):
             },
             config
         )
-        os.remove(manifest_filename)
 
     def test_create_and_write_table_manifest(self):
         ci = CommonInterface()
-        # create table def
-        out_table = ci.create_out_table_definition('some-table.csv',
-                                                   columns=['foo', 'bar'],
-                                                   destination='some-destination',
-                                                   primary_key=['foo'],
-                                                   incremental=True,
-                                                   delete_where={'column': 'lilly',
-                                                                 'values': ['a', 'b'],
-                                                                 'operator': 'eq'},
-                                                   write_always=True,
-                                                   description='some-description'
-                                                   )
-        out_table.table_metadata.add_table_metadata('bar', 'kochba')
-        out_table.table_metadata.add_column_metadata('bar', 'foo', 'gogo')
+        out_table = self._create_sample_out_table(ci, write_always=True, description='some-description')
 
         # write
         ci.write_manifest(out_table, legacy_manifest=True)
@@ -212,27 +240,14 @@ class TestCommonInterface(unittest.TestCase):
             },
             config
         )
-        os.remove(manifest_filename)
 
     def test_create_and_write_table_manifest_old_queue(self):
         # If feature gates exists but doesn't contain queuev2 it's old queue
         os.environ['KBC_PROJECT_FEATURE_GATES'] = 'feature1;someotherfeature'
 
         ci = CommonInterface()
-        # create table def
-        out_table = ci.create_out_table_definition('some-table.csv',
-                                                   columns=['foo', 'bar'],
-                                                   destination='some-destination',
-                                                   primary_key=['foo'],
-                                                   incremental=True,
-                                                   # the write_always will then not be present in the manifest even if set
-                                                   write_always=True,
-                                                   delete_where={'column': 'lilly',
-                                                                 'values': ['a', 'b'],
-                                                                 'operator': 'eq'}
-                                                   )
-        out_table.table_metadata.add_table_metadata('bar', 'kochba')
-        out_table.table_metadata.add_column_metadata('bar', 'foo', 'gogo')
+        # the write_always will then not be present in the manifest even if set
+        out_table = self._create_sample_out_table(ci, write_always=True)
 
         # write
         ci.write_manifest(out_table, legacy_manifest=True)
@@ -255,28 +270,14 @@ class TestCommonInterface(unittest.TestCase):
             },
             config
         )
-        os.remove(manifest_filename)
 
     def test_legacy_manifest_without_columns_with_header(self):
         # If feature gates exists but doesn't contain queuev2 it's old queue
         os.environ['KBC_PROJECT_FEATURE_GATES'] = 'feature1;someotherfeature'
 
         ci = CommonInterface()
-        # create table def
-        out_table = ci.create_out_table_definition('some-table.csv',
-                                                   columns=['foo', 'bar'],
-                                                   destination='some-destination',
-                                                   primary_key=['foo'],
-                                                   incremental=True,
-                                                   # the write_always will then not be present in the manifest even if set
-                                                   write_always=True,
-                                                   has_header=True,
-                                                   delete_where={'column': 'lilly',
-                                                                 'values': ['a', 'b'],
-                                                                 'operator': 'eq'}
-                                                   )
-        out_table.table_metadata.add_table_metadata('bar', 'kochba')
-        out_table.table_metadata.add_column_metadata('bar', 'foo', 'gogo')
+        # the write_always will then not be present in the manifest even if set
+        out_table = self._create_sample_out_table(ci, write_always=True, has_header=True)
 
         # write
         ci.write_manifest(out_table, legacy_manifest=True)
@@ -298,23 +299,11 @@ class TestCommonInterface(unittest.TestCase):
             },
             config
         )
-        os.remove(manifest_filename)
 
     # #### DATA FOLDER MANIPULATION
     def test_create_and_write_table_manifest_multi_deprecated(self):
         ci = CommonInterface()
-        # create table def
-        out_table = ci.create_out_table_definition('some-table.csv',
-                                                   columns=['foo', 'bar'],
-                                                   destination='some-destination',
-                                                   primary_key=['foo'],
-                                                   incremental=True,
-                                                   delete_where={'column': 'lilly',
-                                                                 'values': ['a', 'b'],
-                                                                 'operator': 'eq'}
-                                                   )
-        out_table.table_metadata.add_table_metadata('bar', 'kochba')
-        out_table.table_metadata.add_column_metadata('bar', 'foo', 'gogo')
+        out_table = self._create_sample_out_table(ci)
 
         # write
         ci.write_tabledef_manifests([out_table])
@@ -338,22 +327,10 @@ class TestCommonInterface(unittest.TestCase):
             },
             config
         )
-        os.remove(manifest_filename)
 
     def test_create_and_write_table_manifest_multi(self):
         ci = CommonInterface()
-        # create table def
-        out_table = ci.create_out_table_definition('some-table.csv',
-                                                   columns=['foo', 'bar'],
-                                                   destination='some-destination',
-                                                   primary_key=['foo'],
-                                                   incremental=True,
-                                                   delete_where={'column': 'lilly',
-                                                                 'values': ['a', 'b'],
-                                                                 'operator': 'eq'}
-                                                   )
-        out_table.table_metadata.add_table_metadata('bar', 'kochba')
-        out_table.table_metadata.add_column_metadata('bar', 'foo', 'gogo')
+        out_table = self._create_sample_out_table(ci)
 
         # write
         ci.write_manifests([out_table], legacy_manifest=True)
@@ -377,7 +354,6 @@ class TestCommonInterface(unittest.TestCase):
             },
             config
         )
-        os.remove(manifest_filename)
 
     def test_create_and_write_table_manifest_new(self):
         os.environ['KBC_DATA_TYPE_SUPPORT'] = "authoritative"
@@ -426,7 +402,6 @@ class TestCommonInterface(unittest.TestCase):
              'write_always': False},
             config
         )
-        os.remove(manifest_filename)
 
     def test_legacy_column_metadata_ignored_on_new_schema(self):
         # TODO: this is not implemented on purpose
@@ -478,29 +453,29 @@ class TestCommonInterface(unittest.TestCase):
         tables = ci.get_input_tables_definitions()
 
         self.assertEqual(6, len(tables))
-        for table in tables:
-            if table.name == 'sample.csv':
-                self.assertEqual(table.columns, [
-                    "x",
-                    "Sales",
-                    "CompPrice",
-                    "Income",
-                    "Advertising",
-                    "Population",
-                    "Price",
-                    "ShelveLoc",
-                    "Age",
-                    "Education",
-                    "Urban",
-                    "US",
-                    "High"
-                ])
-                self.assertEqual(table.rows_count, 400)
-                self.assertEqual(table.data_size_bytes, 81920)
-            elif table.name == 'fooBar':
-                self.assertEqual(table.id, 'in.c-main.test2')
-                self.assertEqual(table.full_path, os.path.join(ci.tables_in_path, 'fooBar'))
-                self.assertEqual(table.name, 'fooBar')
+        tables_by_name = {table.name: table for table in tables}
+        sample = tables_by_name['sample.csv']
+        self.assertEqual(sample.columns, SAMPLE_CSV_COLUMNS)
+        self.assertEqual(sample.rows_count, 400)
+        self.assertEqual(sample.data_size_bytes, 81920)
+        foo_bar = tables_by_name['fooBar']
+        self.assertEqual(foo_bar.id, 'in.c-main.test2')
+        self.assertEqual(foo_bar.full_path, os.path.join(ci.tables_in_path, 'fooBar'))
+
+    def test_iter_input_tables_definitions_is_lazy(self):
+        ci = CommonInterface()
+
+        with patch.object(TableDefinition, 'build_from_manifest',
+                          wraps=TableDefinition.build_from_manifest) as build_mock:
+            tables_iter = ci.iter_input_tables_definitions(orphaned_manifests=True)
+            self.assertEqual(0, build_mock.call_count)
+
+            first_table = next(tables_iter)
+            self.assertIsInstance(first_table, TableDefinition)
+            self.assertEqual(1, build_mock.call_count)
+
+        self.assertEqual(sorted(t.name for t in ci.get_input_tables_definitions(orphaned_manifests=True)),
+                         sorted([first_table.name] + [t.name for t in tables_iter]))
 
     def test_get_input_tables_definition_orphaned_manifest(self):
         ci = CommonInterface()
@@ -508,29 +483,14 @@ class TestCommonInterface(unittest.TestCase):
         tables = ci.get_input_tables_definitions(orphaned_manifests=True)
 
         self.assertEqual(7, len(tables))
-        for table in tables:
-            if table.name == 'sample.csv':
-                self.assertEqual(table.columns, [
-                    "x",
-                    "Sales",
-                    "CompPrice",
-                    "Income",
-                    "Advertising",
-                    "Population",
-                    "Price",
-                    "ShelveLoc",
-                    "Age",
-                    "Education",
-                    "Urban",
-                    "US",
-                    "High"
-                ])
-                self.assertEqual(table.rows_count, 400)
-                self.assertEqual(table.data_size_bytes, 81920)
-            elif table.name == 'fooBar':
-                self.assertEqual(table.id, 'in.c-main.test2')
-                self.assertEqual(table.full_path, os.path.join(ci.tables_in_path, 'fooBar'))
-                self.assertEqual(table.name, 'fooBar')
+        tables_by_name = {table.name: table for table in tables}
+        sample = tables_by_name['sample.csv']
+        self.assertEqual(sample.columns, SAMPLE_CSV_COLUMNS)
+        self.assertEqual(sample.rows_count, 400)
+        self.assertEqual(sample.data_size_bytes, 81920)
+        foo_bar = tables_by_name['fooBar']
+        self.assertEqual(foo_bar.id, 'in.c-main.test2')
+        self.assertEqual(foo_bar.full_path, os.path.join(ci.tables_in_path, 'fooBar'))
 
     def test_state_file_initialized(self):
         ci = CommonInterface()
@@ -552,8 +512,30 @@ class TestCommonInterface(unittest.TestCase):
             state
         )
 
-        # cleanup
-        os.remove(state_filename)
+    def test_state_file_paths_follow_data_folder(self):
+        ci = CommonInterface()
+        data_dir = self._copy_data_dir('data1')
+        ci.data_folder_path = data_dir
+        ci.write_state_file({"some_state": 1234})
+        self.assertTrue(os.path.isfile(os.path.join(data_dir, 'out', 'state.json')))
+
+    def test_state_file_directory_returns_empty(self):
+        data_dir = self._copy_data_dir('data1')
+        state_path = os.path.join(data_dir, 'in', 'state.json')
+        os.remove(state_path)
+        os.mkdir(state_path)
+        ci = CommonInterface(data_folder_path=data_dir)
+        self.assertEqual({}, ci.get_state_file())
+
+    def test_state_file_under_file_returns_empty(self):
+        data_dir = self._copy_data_dir('data1')
+        ci = CommonInterface(data_folder_path=data_dir)
+        # the "in" folder is a file, the state path cannot be a file
+        shutil.rmtree(os.path.join(data_dir, 'in'))
+        with open(os.path.join(data_dir, 'in'), 'w'):
+            pass
+        self.assertEqual({}, ci.get_state_file())
+
 
     def test_get_input_table_by_name_fails_on_nonexistent(self):
         ci = CommonInterface()
@@ -593,7 +575,6 @@ class TestCommonInterface(unittest.TestCase):
              'notify': True},
             config
         )
-        os.remove(manifest_filename)
 
     def test_create_and_write_file_manifest(self):
         ci = CommonInterface()
@@ -620,7 +601,6 @@ class TestCommonInterface(unittest.TestCase):
              'notify': True},
             config
         )
-        os.remove(manifest_filename)
 
     def test_get_input_files_definition_latest(self):
         ci = CommonInterface()
@@ -628,9 +608,8 @@ class TestCommonInterface(unittest.TestCase):
         files = ci.get_input_files_definitions()
 
         self.assertEqual(len(files), 5)
-        for file in files:
-            if file.name == 'duty_calls.png':
-                self.assertEqual(file.id, '151971455')
+        files_by_name = {file.name: file for file in files}
+        self.assertEqual(files_by_name['duty_calls.png'].id, '151971455')
 
     def test_get_input_files_definition_by_tag(self):
         ci = CommonInterface()
@@ -638,53 +617,48 @@ class TestCommonInterface(unittest.TestCase):
         files = ci.get_input_files_definitions(tags=['dilbert'])
 
         self.assertEqual(len(files), 3)
-        for file in files:
-            if file.name == '21702.strip.print.gif':
-                self.assertEqual(file.tags, [
-                    "dilbert"
-                ])
-                self.assertEqual(file.max_age_days, 180)
-                self.assertEqual(file.size_bytes, 4931)
+        file = {file.name: file for file in files}['21702.strip.print.gif']
+        self.assertEqual(file.tags, [
+            "dilbert"
+        ])
+        self.assertEqual(file.max_age_days, 180)
+        self.assertEqual(file.size_bytes, 4931)
 
     def test_get_input_files_definition_by_tag_w_system(self):
-        ci = CommonInterface(os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                          'data_examples', 'data_system_tags'))
+        ci = CommonInterface(os.path.join(DATA_EXAMPLES_DIR, 'data_system_tags'))
 
         files = ci.get_input_files_definitions(tags=['dilbert'])
 
         self.assertEqual(len(files), 3)
-        for file in files:
-            if file.name == '21702.strip.print.gif':
-                self.assertEqual(file.tags, [
-                    "dilbert",
-                    "componentId: 1234",
-                    "configurationId: 12345",
-                    "configurationRowId: 12345",
-                    "runId: 22123",
-                    "branchId: 312321"
-                ])
-                self.assertEqual(file.max_age_days, 180)
-                self.assertEqual(file.size_bytes, 4931)
+        file = {file.name: file for file in files}['21702.strip.print.gif']
+        self.assertEqual(file.tags, [
+            "dilbert",
+            "componentId: 1234",
+            "configurationId: 12345",
+            "configurationRowId: 12345",
+            "runId: 22123",
+            "branchId: 312321"
+        ])
+        self.assertEqual(file.max_age_days, 180)
+        self.assertEqual(file.size_bytes, 4931)
 
     def test_get_input_files_definition_tag_group_w_system(self):
-        ci = CommonInterface(os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                          'data_examples', 'data_system_tags'))
+        ci = CommonInterface(os.path.join(DATA_EXAMPLES_DIR, 'data_system_tags'))
 
         files = ci.get_input_file_definitions_grouped_by_tag_group(only_latest_files=False)
 
         self.assertEqual(len(files), 2)
         self.assertEqual(len(files["bar;foo"]), 3)
-        for file in files["bar;foo"]:
-            if file.name == 'compiler_complaint.png':
-                self.assertEqual(file.tags, [
-                    "foo",
-                    "bar",
-                    "componentId: 1234",
-                    "configurationId: 12345",
-                    "configurationRowId: 12345",
-                    "runId: 22123",
-                    "branchId: 312321"
-                ])
+        file = {file.name: file for file in files["bar;foo"]}['compiler_complaint.png']
+        self.assertEqual(file.tags, [
+            "foo",
+            "bar",
+            "componentId: 1234",
+            "configurationId: 12345",
+            "configurationRowId: 12345",
+            "runId: 22123",
+            "branchId: 312321"
+        ])
 
     def test_get_input_files_definition_nofilter(self):
         ci = CommonInterface()
@@ -692,17 +666,18 @@ class TestCommonInterface(unittest.TestCase):
         files = ci.get_input_files_definitions(only_latest_files=False)
 
         self.assertEqual(len(files), 6)
-        for file in files:
-            if file.name == 'duty_calls':
-                self.assertEqual(file.tags, [
-                    "xkcd"
-                ])
-                self.assertEqual(file.max_age_days, 180)
-                self.assertEqual(file.size_bytes, 30027)
+        # file names repeat across versions, look the older duty_calls.png version up by id
+        # (the id is an int from the manifest until the name property normalises it from the file name)
+        file = {str(file.id): file for file in files}['151971450']
+        self.assertEqual(file.name, 'duty_calls.png')
+        self.assertEqual(file.tags, [
+            "xkcd"
+        ])
+        self.assertEqual(file.max_age_days, 180)
+        self.assertEqual(file.size_bytes, 30027)
 
     def test_get_input_files_definition_no_manifest_passes(self):
-        ci = CommonInterface(os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                                          'data_examples', 'data2'))
+        ci = CommonInterface(os.path.join(DATA_EXAMPLES_DIR, 'data2'))
 
         files = ci.get_input_files_definitions(only_latest_files=True)
 
@@ -713,7 +688,7 @@ class TestCommonInterface(unittest.TestCase):
             self.assertEqual(file.created, None)
 
     def test_convert_old_to_new_manifest(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples', 'data4')
+        path = os.path.join(DATA_EXAMPLES_DIR, 'data4')
         os.environ["KBC_DATADIR"] = path
 
         ci = CommonInterface()
@@ -745,10 +720,8 @@ class TestCommonInterface(unittest.TestCase):
                 {'name': 'High', 'data_type': {'base': {'type': 'STRING'}}, 'nullable': True}]
         }, new_manifest)
 
-        del os.environ['KBC_DATA_TYPE_SUPPORT']
-
     def test_convert_new_to_old_manifest_has_header_false(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples', 'data_new_manifest')
+        path = os.path.join(DATA_EXAMPLES_DIR, 'data_new_manifest')
         os.environ["KBC_DATADIR"] = path
 
         ci = CommonInterface()
@@ -757,8 +730,7 @@ class TestCommonInterface(unittest.TestCase):
         old_manifest = tables[0].get_manifest_dictionary('out', legacy_manifest=True)
 
         self.assertEqual({
-            'columns': ['x', 'Sales', 'CompPrice', 'Income', 'Advertising', 'Population', 'Price', 'ShelveLoc', 'Age',
-                        'Education', 'Urban', 'US', 'High'],
+            'columns': SAMPLE_CSV_COLUMNS,
             'delimiter': ',',
             'enclosure': '"',
             'incremental': False,
@@ -766,8 +738,7 @@ class TestCommonInterface(unittest.TestCase):
         }, old_manifest)
 
     def test_convert_new_to_old_manifest_storage_param(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples',
-                            'data_storage_parameter_data_types')
+        path = self._copy_data_dir('data_storage_parameter_data_types')
         os.environ["KBC_DATADIR"] = path
         os.environ['KBC_DATA_TYPE_SUPPORT'] = 'authoritative'
 
@@ -780,8 +751,7 @@ class TestCommonInterface(unittest.TestCase):
             old_manifest = json.load(manifest_file)
 
         self.assertEqual({
-            'columns': ['x', 'Sales', 'CompPrice', 'Income', 'Advertising', 'Population', 'Price', 'ShelveLoc', 'Age',
-                        'Education', 'Urban', 'US', 'High'],
+            'columns': SAMPLE_CSV_COLUMNS,
             'delimiter': ',',
             'enclosure': '"',
             'incremental': False,
@@ -789,7 +759,7 @@ class TestCommonInterface(unittest.TestCase):
         }, old_manifest)
 
     def test_full_input_manifest(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples', 'data_full_input_manifest')
+        path = self._copy_data_dir('data_full_input_manifest')
         os.environ["KBC_DATADIR"] = path
 
         ci = CommonInterface()
@@ -813,12 +783,11 @@ class TestCommonInterface(unittest.TestCase):
             'indexed_columns': ['x'],
             'primary_key': ['x'],
             'column_metadata': {'x': [{'key': 'foo', 'value': 'gogo'}]},
-            'columns': ['x', 'Sales', 'CompPrice', 'Income', 'Advertising', 'Population', 'Price', 'ShelveLoc', 'Age',
-                        'Education', 'Urban', 'US', 'High']
+            'columns': SAMPLE_CSV_COLUMNS
         }, old_manifest)
 
     def test_full_input_manifest_dtypes_support(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples', 'data_full_input_manifest')
+        path = self._copy_data_dir('data_full_input_manifest')
         os.environ["KBC_DATADIR"] = path
         os.environ['KBC_DATA_TYPE_SUPPORT'] = 'authoritative'
 
@@ -845,12 +814,11 @@ class TestCommonInterface(unittest.TestCase):
             'indexed_columns': ['x'],
             'primary_key': ['x'],
             'column_metadata': {'x': [{'key': 'foo', 'value': 'gogo'}]},
-            'columns': ['x', 'Sales', 'CompPrice', 'Income', 'Advertising', 'Population', 'Price', 'ShelveLoc', 'Age',
-                        'Education', 'Urban', 'US', 'High']
+            'columns': SAMPLE_CSV_COLUMNS
         }, old_manifest)
 
     def test_separator_delimiter(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples', 'data5')
+        path = os.path.join(DATA_EXAMPLES_DIR, 'data5')
         os.environ["KBC_DATADIR"] = path
 
         ci = CommonInterface()
@@ -859,21 +827,7 @@ class TestCommonInterface(unittest.TestCase):
         old_manifest = tables[0].get_manifest_dictionary('out', legacy_manifest=True)
 
         self.assertEqual({
-            'columns': [
-                'x',
-                'Sales',
-                'CompPrice',
-                'Income',
-                'Advertising',
-                'Population',
-                'Price',
-                'ShelveLoc',
-                'Age',
-                'Education',
-                'Urban',
-                'US',
-                'High'
-            ],
+            'columns': SAMPLE_CSV_COLUMNS,
             'delimiter': '\t',
             'enclosure': "'",
             'incremental': True,
@@ -888,7 +842,7 @@ class TestCommonInterface(unittest.TestCase):
         }, old_manifest)
 
     def test_separator_delimiter_dtypes(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples', 'data5')
+        path = os.path.join(DATA_EXAMPLES_DIR, 'data5')
         os.environ["KBC_DATADIR"] = path
 
         ci = CommonInterface()
@@ -925,15 +879,13 @@ class TestCommonInterface(unittest.TestCase):
             'destination': 'out.c-main.Leads'
         }, new_manifest)
 
-        del os.environ['KBC_DATA_TYPE_SUPPORT']
-
 
 class TestConfiguration(unittest.TestCase):
 
-    def setUp(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data1')
-        os.environ["KBC_DATADIR"] = path
+    @classmethod
+    def setUpClass(cls):
+        # parsed once, the tests below only read from it
+        cls._config = Configuration(DATA_1_DIR)
 
     def test_missing_config(self):
         with self.assertRaisesRegex(
@@ -942,7 +894,7 @@ class TestConfiguration(unittest.TestCase):
             Configuration('/non-existent/')
 
     def test_get_parameters(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
         params = cfg.parameters
         self.assertEqual({'fooBar': {'bar': 24, 'foo': 42}, 'baz': 'bazBar'},
                          params)
@@ -950,17 +902,16 @@ class TestConfiguration(unittest.TestCase):
         self.assertEqual(params['fooBar']['bar'], 24)
 
     def test_get_action(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
 
         self.assertEqual(cfg.action, 'run')
 
     def test_get_action_empty_config(self):
-        cfg = Configuration(os.path.join(os.getenv('KBC_DATADIR', ''), '..',
-                                         'data2'))
+        cfg = Configuration(os.path.join(DATA_EXAMPLES_DIR, 'data2'))
         self.assertEqual(cfg.action, '')
 
     def test_get_input_mappings(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
         tables = cfg.tables_input_mapping
 
         self.assertEqual(len(tables), 2)
@@ -971,8 +922,7 @@ class TestConfiguration(unittest.TestCase):
                 self.assertEqual('in.c-main.test2', table['source'])
 
     def test_get_input_mappings_with_column_types(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            'data_examples', 'data4')
+        path = os.path.join(DATA_EXAMPLES_DIR, 'data4')
         cfg = Configuration(path)
         tables = cfg.tables_input_mapping
         coltypes = tables[0].column_types[0]
@@ -990,15 +940,26 @@ class TestConfiguration(unittest.TestCase):
         self.assertEqual(convert_empty_values_to_null, False)
 
     def test_get_output_mapping(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
         tables = cfg.tables_output_mapping
         self.assertEqual(len(tables), 2)
         self.assertEqual(tables[0]['source'], 'results.csv')
         self.assertEqual(tables[1]['source'], 'results-new.csv')
 
+    def test_get_files_input_mapping(self):
+        cfg = Configuration(DATA_1_DIR)
+        config_data = copy.deepcopy(cfg.config_data)
+
+        files = cfg.files_input_mapping
+
+        self.assertEqual([FileInputMapping(tags=['dilbert']), FileInputMapping(tags=['xkcd'])], files)
+        # parsed once and the raw configuration is left intact
+        self.assertIs(files, cfg.files_input_mapping)
+        self.assertIs(files, cfg._mappings_cache['files_input'])
+        self.assertEqual(config_data, cfg.config_data)
+
     def test_empty_storage(self):
-        cfg = Configuration(os.path.join(os.getenv('KBC_DATADIR', ''), '..',
-                                         'data2'))
+        cfg = Configuration(os.path.join(DATA_EXAMPLES_DIR, 'data2'))
         self.assertEqual(cfg.tables_output_mapping, [])
         self.assertEqual(cfg.files_output_mapping, [])
         self.assertEqual(cfg.tables_input_mapping, [])
@@ -1006,28 +967,27 @@ class TestConfiguration(unittest.TestCase):
         self.assertEqual(cfg.parameters, {})
 
     def test_empty_params(self):
-        cfg = Configuration(os.path.join(os.getenv('KBC_DATADIR', ''), '..',
-                                         'data3'))
+        cfg = Configuration(os.path.join(DATA_EXAMPLES_DIR, 'data3'))
         self.assertEqual([], cfg.tables_output_mapping)
         self.assertEqual([], cfg.files_output_mapping)
         self.assertEqual({}, cfg.parameters)
 
     def test_get_authorization(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
         auth = cfg.oauth_credentials
         # self.assertEqual(auth['id'], "123456")
         self.assertEqual(auth["id"], "main")
 
     def test_get_oauthapi_data(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
         self.assertDictEqual(cfg.oauth_credentials.data, {"mykey": "myval"})
 
     def test_get_oauthapi_appsecret(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
         self.assertEqual(cfg.oauth_credentials.appSecret, "myappsecret")
 
     def test_get_oauthapi_appkey(self):
-        cfg = Configuration(os.environ["KBC_DATADIR"])
+        cfg = self._config
         self.assertEqual(cfg.oauth_credentials.appKey, "myappkey")
 
     # def test_file_manifest(self):
@@ -0,0 +1,89 @@
+import dataclasses
+import datetime
+import enum
+import importlib
+import json
+import os
+import sys
+import tempfile
+import unittest
+import uuid
+from unittest.mock import patch
+
+from keboola.component import _json
+
+
+class TestJsonBackend(unittest.TestCase):
+
+    def test_loads_accepts_bytes_and_str(self):
+        expected = {"a": [1, 2.5, None, True], "b": "čšř"}
+        self.assertEqual(expected, _json.loads(json.dumps(expected)))
+        self.assertEqual(expected, _json.loads(json.dumps(expected).encode('utf-8')))
+
+    def test_loads_nan_falls_back_to_stdlib(self):
+        result = _json.loads('{"a": NaN}')
+        self.assertNotEqual(result['a'], result['a'])
+
+    def test_loads_invalid_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            _json.loads('{"a": ')
+
+    def test_dumps_returns_bytes(self):
+        data = {"a": [1, 2], "b": "čšř", "c": {"d": None}}
+        result = _json.dumps(data)
+        self.assertIsInstance(result, bytes)
+        self.assertEqual(data, json.loads(result))
+
+    def test_dumps_non_serializable_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            _json.dumps({"a": object()})
+
+    def test_dumps_non_finite_floats_same_as_stdlib(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            data = {"a": [value], value: 1}
+            self.assertEqual(json.dumps(data).encode('utf-8'), _json.dumps(data))
+
+    def test_dumps_types_rejected_by_stdlib_raise_type_error(self):
+        @dataclasses.dataclass
+        class Point:
+            x: int
+
+        class Color(enum.Enum):
+            RED = 1
+
+        for value in (datetime.datetime(2020, 1, 1), datetime.date(2020, 1, 1), Point(1), uuid.uuid4(),
+                      Color.RED):
+            with self.subTest(value=value), self.assertRaises(TypeError):
+                _json.dumps({"a": [value]})
+
+        with self.assertRaises(TypeError):
+            _json.dumps({Color.RED: 1})
+
+    def test_dumps_str_enum_same_as_stdlib(self):
+        class Color(str, enum.Enum):
+            RED = 'red'
+
+        data = {"a": Color.RED}
+        self.assertEqual(json.dumps(data).encode('utf-8'), _json.dumps(data))
+
+    def test_dumps_same_bytes_with_and_without_fast_backend(self):
+        data = {"a": [1e16, 0.1, -0.0, 10 ** 20], "b": "čšř / \u2028", "c": {"d": None, "e": True}}
+        expected = json.dumps(data).encode('utf-8')
+        self.assertEqual(expected, _json.dumps(data))
+
+        self.addCleanup(importlib.reload, _json)
+        with patch.dict(sys.modules, {'orjson': None, 'rapidjson': None, 'ujson': None}):
+            importlib.reload(_json)
+        self.assertEqual('json', _json.BACKEND)
+        self.assertEqual(expected, _json.dumps(data))
+
+    def test_file_roundtrip(self):
+        data = {"a": [1, 2], "b": "čšř"}
+        with tempfile.TemporaryDirectory(prefix='kbc-test') as tmp_dir:
+            path = os.path.join(tmp_dir, 'test.json')
+            _json.dump_file(data, path)
+            self.assertEqual(data, _json.load_file(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
 import os
 import unittest
+from unittest.mock import patch
 
 from keboola.component.base import ComponentBase
 
+TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+DATA_1_DIR = os.path.join(TESTS_DIR, 'data_examples', 'data1')
+SCHEMA_EXAMPLES_DIR = os.path.join(TESTS_DIR, 'schema_examples')
+SCHEMAS_DIR = os.path.join(SCHEMA_EXAMPLES_DIR, 'schemas')
+FAULTY_SCHEMAS_DIR = os.path.join(SCHEMA_EXAMPLES_DIR, 'faulty-schemas')
+
 
 class MockComponent(ComponentBase):
     def run(self):
@@ -11,27 +18,27 @@ class MockComponent(ComponentBase):
 
 class TestCommonInterface(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # the valid schema and its table definition are built once, the tests only read from them
+        with patch.dict(os.environ, {'KBC_DATADIR': DATA_1_DIR, 'KBC_STACKID': 'test'}):
+            cls.comp = MockComponent(schema_path_override=SCHEMAS_DIR)
+        cls.order_schema = cls.comp.get_table_schema_by_name(schema_name="order")
+        cls.order_table_definition = cls.comp.create_out_table_definition_from_schema(cls.order_schema)
+
     def setUp(self):
-        path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data_examples', 'data1')
-        os.environ["KBC_DATADIR"] = path
-        # to simulate kbc run
-        os.environ["KBC_STACKID"] = 'test'
+        # KBC_STACKID to simulate kbc run
+        env_patcher = patch.dict(os.environ, {'KBC_DATADIR': DATA_1_DIR, 'KBC_STACKID': 'test'})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
 
     def test_create_out_table_definition_from_schema_name(self):
-        schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'schemas')
-        comp = MockComponent(schema_path_override=schema_path)
-        order_schema = comp.get_table_schema_by_name(schema_name="order")
-        order_table_definition_from_schema = comp.create_out_table_definition_from_schema(order_schema)
-        self.assertEqual("order.csv", order_table_definition_from_schema.name)
-        self.assertEqual(["id", "product_id", "quantity"], order_table_definition_from_schema.columns)
-        self.assertEqual(["id"], order_table_definition_from_schema.primary_key)
+        self.assertEqual("order.csv", self.order_table_definition.name)
+        self.assertEqual(["id", "product_id", "quantity"], self.order_table_definition.columns)
+        self.assertEqual(["id"], self.order_table_definition.primary_key)
 
     def test_created_manifest_against_schema(self):
-        schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'schemas')
-        comp = MockComponent(schema_path_override=schema_path)
-        order_schema = comp.get_table_schema_by_name(schema_name="order")
-        order_table_definition_from_schema = comp.create_out_table_definition_from_schema(order_schema)
-        manifest_dict = order_table_definition_from_schema.get_manifest_dictionary(legacy_manifest=True)
+        manifest_dict = self.order_table_definition.get_manifest_dictionary(legacy_manifest=True)
         expected_manifest = {'primary_key': ['id'], 'columns': ['id', 'product_id', 'quantity'], 'enclosure': '"',
                              'delimiter': ',',
                              'write_always': False,
@@ -52,11 +59,9 @@ class TestCommonInterface(unittest.TestCase):
 
     def test_created_manifest_against_schema_new_manifest(self):
         os.environ['KBC_DATA_TYPE_SUPPORT'] = "authoritative"
-
-        schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'schemas')
-        comp = MockComponent(schema_path_override=schema_path)
-        order_schema = comp.get_table_schema_by_name(schema_name="order")
-        order_table_definition_from_schema = comp.create_out_table_definition_from_schema(order_schema)
+        # the data type support is read from the environment on init, the shared component can't be used
+        comp = MockComponent(schema_path_override=SCHEMAS_DIR)
+        order_table_definition_from_schema = comp.create_out_table_definition_from_schema(self.order_schema)
         manifest_dict = order_table_definition_from_schema.get_manifest_dictionary(legacy_manifest=False)
 
         expected_manifest = {'delimiter': ',',
@@ -75,43 +80,21 @@ class TestCommonInterface(unittest.TestCase):
                                          'description': 'Quantity of the product in order',
                                          'name': 'quantity'}],
                              'write_always': False}
-        del os.environ['KBC_DATA_TYPE_SUPPORT']
         self.assertEqual(expected_manifest, manifest_dict)
 
-    def test_invalid_column_schema_raises_key_error(self):
-        with self.assertRaises(KeyError):
-            schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'faulty-schemas')
-            comp = MockComponent(schema_path_override=schema_path)
-            table_schema = comp.get_table_schema_by_name(schema_name="invalid_column_schema")
-            comp.create_out_table_definition_from_schema(table_schema)
-
-    def test_invalid_schema_raises_key_error(self):
-        with self.assertRaises(KeyError):
-            schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'faulty-schemas')
-            comp = MockComponent(schema_path_override=schema_path)
-            table_schema = comp.get_table_schema_by_name(schema_name="invalid_table_schema")
-            comp.create_out_table_definition_from_schema(table_schema)
-
-    def test_missing_schema_raises_key_error(self):
-        with self.assertRaises(FileNotFoundError):
-            schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'faulty-schemas')
-            comp = MockComponent(schema_path_override=schema_path)
-            table_schema = comp.get_table_schema_by_name(schema_name="missing")
-            comp.create_out_table_definition_from_schema(table_schema)
-
-    def test_invalid_schema_path_raises_key_error(self):
-        with self.assertRaises(FileNotFoundError):
-            schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'missing')
-            comp = MockComponent(schema_path_override=schema_path)
-            table_schema = comp.get_table_schema_by_name(schema_name="missing")
-            comp.create_out_table_definition_from_schema(table_schema)
-
-    def test_invalid_base_type_raises_key_error(self):
-        with self.assertRaises(ValueError):
-            schema_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'schema_examples', 'faulty-schemas')
-            comp = MockComponent(schema_path_override=schema_path)
-            table_schema = comp.get_table_schema_by_name(schema_name="invalid_base_type")
-            comp.create_out_table_definition_from_schema(table_schema)
+    def test_faulty_schemas_fail(self):
+        cases = [(FAULTY_SCHEMAS_DIR, "invalid_column_schema", KeyError),
+                 (FAULTY_SCHEMAS_DIR, "invalid_table_schema", KeyError),
+                 (FAULTY_SCHEMAS_DIR, "missing", FileNotFoundError),
+                 (os.path.join(SCHEMA_EXAMPLES_DIR, 'missing'), "missing", FileNotFoundError),
+                 (FAULTY_SCHEMAS_DIR, "invalid_base_type", ValueError)]
+        for schema_path, schema_name, expected_exception in cases:
+            with self.subTest(schema_path=schema_path, schema_name=schema_name):
+                # the schema folder is validated lazily, only loading the schema may fail
+                comp = MockComponent(schema_path_override=schema_path)
+                with self.assertRaises(expected_exception):
+                    table_schema = comp.get_table_schema_by_name(schema_name=schema_name)
+                    comp.create_out_table_definition_from_schema(table_schema)
 
 
 if __name__ == '__main__':
@@ -1,6 +1,12 @@
+import json
 import unittest
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 
-from keboola.component.sync_actions import SelectElement, ValidationResult, process_sync_action_result, MessageType
+from keboola.component.sync_actions import SelectElement, ValidationResult, process_sync_action_result, MessageType, \
+    SyncActionResult
+
+EXPECTED_SELECT_OPTIONS = [{"value": "value_a", "label": "label_a"}, {"value": "value_b", "label": "value_b"}]
 
 
 class TestSyncActions(unittest.TestCase):
@@ -8,21 +14,62 @@ class TestSyncActions(unittest.TestCase):
     def test_select_element_return_value(self):
         select_options = [SelectElement("value_a", "label_a"),
                           SelectElement("value_b")]
-        expected = '[{"value": "value_a", "label": "label_a"}, {"value": "value_b", "label": "value_b"}]'
-        self.assertEqual(process_sync_action_result(select_options), expected)
+        self.assertEqual(json.loads(process_sync_action_result(select_options)), EXPECTED_SELECT_OPTIONS)
 
     def test_select_element_return_value_legacy(self):
         select_options = [dict(value="value_a", label="label_a"),
                           dict(value="value_b", label="value_b")]
-        expected = '[{"value": "value_a", "label": "label_a"}, {"value": "value_b", "label": "value_b"}]'
-        self.assertEqual(process_sync_action_result(select_options), expected)
+        self.assertEqual(json.loads(process_sync_action_result(select_options)), EXPECTED_SELECT_OPTIONS)
 
     def test_validation_result_value(self):
         result = ValidationResult("Some Message", MessageType.WARNING)
-        expected = '{"message": "Some Message", "type": "warning", "status": "success"}'
-        self.assertEqual(process_sync_action_result(result), expected)
+        expected = {"message": "Some Message", "type": "warning", "status": "success"}
+        self.assertEqual(json.loads(process_sync_action_result(result)), expected)
 
         # default type
         result = ValidationResult("Some Message")
-        expected = '{"message": "Some Message", "type": "info", "status": "success"}'
+        expected = {"message": "Some Message", "type": "info", "status": "success"}
+        self.assertEqual(json.loads(process_sync_action_result(result)), expected)
+
+    def test_result_wire_format(self):
+        # the output is read by the platform, keep it byte for byte the same as json.dumps
+        result = ValidationResult("Zpráva", MessageType.WARNING)
+        expected = '{"message": "Zpr\\u00e1va", "type": "warning", "status": "success"}'
         self.assertEqual(process_sync_action_result(result), expected)
+
+        select_options = [SelectElement("value_a", "label_a"), SelectElement("value_b")]
+        expected = '[{"value": "value_a", "label": "label_a"}, {"value": "value_b", "label": "value_b"}]'
+        self.assertEqual(process_sync_action_result(select_options), expected)
+
+    def test_result_contains_only_fields_and_status(self):
+        @dataclass
+        class Nested:
+            name: str
+            description: Optional[str] = None
+
+        @dataclass
+        class CustomResult(SyncActionResult):
+            nested: Nested
+
+        result = CustomResult(Nested("a"))
+        result._cache = 'not a field'
+        expected = {"nested": {"name": "a"}, "status": "success"}
+        self.assertEqual(json.loads(process_sync_action_result(result)), expected)
+
+        result.status = ''
+        self.assertEqual(json.loads(process_sync_action_result(result)), {"nested": {"name": "a"}})
+
+    def test_result_converts_dataclasses_in_containers(self):
+        @dataclass
+        class Item:
+            a: str
+            b: Optional[str] = None
+
+        @dataclass
+        class CustomResult(SyncActionResult):
+            items: List[Item]
+            items_by_key: Dict[str, Item]
+
+        result = CustomResult([Item("x")], {"k": Item("y", "z")})
+        expected = {"items": [{"a": "x"}], "items_by_key": {"k": {"a": "y", "b": "z"}}, "status": "success"}
+        self.assertEqual(json.loads(process_sync_action_result(result)), expected)